@@ -393,8 +393,8 @@ class DocumentController():
             msg = "Part contains staple loop(s) at %s.\n\nUse the break tool to introduce 5' & 3' ends before exporting. Loops have been colored red; use undo to revert." % locs
             dialogWarning.title.setText("Staple validation failed")
             dialogWarning.message.setText(msg)
-            for o in stapLoopOlgs:
-                o.applyColor(styles.stapColors[0].name())
+            loopColor = styles.stapColors[0].name()
+            part.applyColors(dict((o, loopColor) for o in stapLoopOlgs))
             dialog.exec_()
             return
 
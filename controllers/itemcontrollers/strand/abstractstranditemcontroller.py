@@ -73,6 +73,7 @@ class AbstractStrandItemController(object):
         mO = self._modelStrand.oligo()
         self._modelOligo = mO
         mO.oligoAppearanceChangedSignal.connect(sI.oligoAppearanceChangedSlot)
+        mO.oligoIdentityChangedSignal.connect(sI.oligoIdentityChangedSlot)
     # end def
 
     def disconnectSignals(self):
@@ -100,4 +101,5 @@ class AbstractStrandItemController(object):
         sI = self._strandItem
         mO = self._modelOligo
         mO.oligoAppearanceChangedSignal.disconnect(sI.oligoAppearanceChangedSlot)
+        mO.oligoIdentityChangedSignal.disconnect(sI.oligoIdentityChangedSlot)
     # end def
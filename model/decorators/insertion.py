@@ -29,10 +29,14 @@ class Insertion(object):
     """
     Insertions do affect an applied sequence and do not store a sequence
     themselves.  They are a skip if the length is less than 0
+
+    Like strands, insertions store their index relative to the part's
+    base offset.
     """
-    def __init__(self, index, length):
+    def __init__(self, index, length, part):
         self._length = length
-        self._index  = index
+        self._part = part
+        self._index  = index - part.baseOffset()
     # end def
 
     def length(self):
@@ -50,7 +54,7 @@ class Insertion(object):
     # end def
 
     def idx(self):
-        return self._index
+        return self._index + self._part.baseOffset()
     # end def
 
     def isSkip(self):
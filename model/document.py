@@ -206,21 +206,11 @@ class Document(QObject):
         minLowDelta = strandSet.partMaxBaseIdx()
         minHighDelta = strandSet.partMaxBaseIdx()  # init the return values
         sSDict = self._selectionDict[strandSet]
-        # get the StrandSet index of the first item in the list
-        sSIdx = strandSet._findIndexOfRangeFor(selectedStrandList[0][0])[2]
-        sSList = strandSet._strandList
-        lenSSList = len(sSList)
-        maxSSIdx = lenSSList - 1
-        i = 0
         for strand, value in selectedStrandList:
-            while strand != sSList[sSIdx]:
-                # incase there are gaps due to double xovers
-                sSIdx += 1
-            # end while
             idxL, idxH = strand.idxs()
+            lowNeighbor, highNeighbor = strandSet.getNeighbors(strand)
             if value[0]:    # the end is selected
-                if sSIdx > 0:
-                    lowNeighbor = sSList[sSIdx - 1]
+                if lowNeighbor:
                     if lowNeighbor in sSDict:
                         valueN = sSDict[lowNeighbor]
                         # we only care if the low neighbor is not selected
@@ -243,8 +233,7 @@ class Document(QObject):
                         minHighDelta = temp
             # end if
             if value[1]:
-                if sSIdx < maxSSIdx:
-                    highNeighbor = sSList[sSIdx + 1]
+                if highNeighbor:
                     if highNeighbor in sSDict:
                         valueN = sSDict[highNeighbor]
                         # we only care if the low neighbor is not selected
@@ -266,8 +255,6 @@ class Document(QObject):
                     if temp < minLowDelta:
                         minLowDelta = temp
             # end if
-            # increment counter
-            sSIdx += 1
         # end for
         return (minLowDelta, minHighDelta)
     # end def
@@ -346,21 +333,17 @@ class Document(QObject):
 
     def paintSelection(self, scafColor, stapColor, useUndoStack=True):
         """Delete xovers if present. Otherwise delete everything."""
-        scafOligos = {}
-        stapOligos = {}
+        partColors = {}  # part -> {oligo: color}
         for strandSetDict in self._selectionDict.values():
             for strand, value in strandSetDict.items():
-                if strand.isScaffold():
-                    scafOligos[strand.oligo()] = True
-                else:
-                    stapOligos[strand.oligo()] = True
+                olg = strand.oligo()
+                color = scafColor if strand.isScaffold() else stapColor
+                partColors.setdefault(olg.part(), {})[olg] = color
 
         if useUndoStack:
             self.undoStack().beginMacro("Paint strands")
-        for olg in scafOligos.keys():
-            olg.applyColor(scafColor)
-        for olg in stapOligos.keys():
-            olg.applyColor(stapColor)
+        for part, oligoColors in partColors.iteritems():
+            part.applyColors(oligoColors, useUndoStack)
         if useUndoStack:
             self.undoStack().endMacro()
 
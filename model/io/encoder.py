@@ -23,9 +23,20 @@
 # http://www.opensource.org/licenses/mit-license.php
 
 from json import dumps
-from legacyencoder import legacy_dict_from_doc
+from legacyencoder import legacy_dict_from_doc, legacy_array_json
 
 def encode(document, helixOrderList, io):
     obj = legacy_dict_from_doc(document, io.name, helixOrderList)
-    json_string = dumps(obj, separators=(',',':'))  # compact encoding
-    io.write(json_string)
+    vhList = obj.pop("vstrands")
+    sep = (',',':')  # compact encoding
+    # stream the helices, writing the per-base strand arrays straight from
+    # their flat arrays rather than building lists for dumps
+    io.write(dumps(obj, separators=sep)[:-1] + ',"vstrands":[')
+    for i, vhDict in enumerate(vhList):
+        if i > 0:
+            io.write(',')
+        scaf, stap = vhDict.pop("scaf"), vhDict.pop("stap")
+        io.write(dumps(vhDict, separators=sep)[:-1])
+        io.write(',"scaf":' + legacy_array_json(scaf))
+        io.write(',"stap":' + legacy_array_json(stap) + '}')
+    io.write(']}')
@@ -168,10 +168,10 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
                     scaf_xo[vhNum].append((i, threeVH, threeIdx))
             assert (len(scaf_seg[vhNum]) % 2 == 0)
             # install scaffold segments
-            for i in range(0, len(scaf_seg[vhNum]), 2):
-                lowIdx = scaf_seg[vhNum][i]
-                highIdx = scaf_seg[vhNum][i+1]
-                scafStrandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
+            segs = scaf_seg[vhNum]
+            if segs:
+                scafStrandSet.createStrands(zip(segs[::2], segs[1::2]),
+                                            useUndoStack=False)
             # read staple segments and xovers
             for i in range(len(stap)):
                 fiveVH, fiveIdx, threeVH, threeIdx = stap[i]
@@ -186,10 +186,10 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
                     stap_xo[vhNum].append((i, threeVH, threeIdx))
             assert (len(stap_seg[vhNum]) % 2 == 0)
             # install staple segments
-            for i in range(0, len(stap_seg[vhNum]), 2):
-                lowIdx = stap_seg[vhNum][i]
-                highIdx = stap_seg[vhNum][i+1]
-                stapStrandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
+            segs = stap_seg[vhNum]
+            if segs:
+                stapStrandSet.createStrands(zip(segs[::2], segs[1::2]),
+                                            useUndoStack=False)
     except AssertionError:
         if not cadnano.app().isGui():
             print "Unrecognized file format."
@@ -199,39 +199,41 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
             dialog.exec_()
 
     # INSTALL XOVERS
+    # file helix numbers may differ from the ones the part assigned
+    partVhNum = {}
+    for vhNum, coord in vhNumToCoord.iteritems():
+        partVhNum[vhNum] = part.virtualHelixAtCoord(coord).number()
+    xovers = []  # (strandType, fromVhNum, idx5p, toVhNum, idx3p)
     for helix in obj['vstrands']:
         vhNum = helix['num']
-        row = helix['row']
-        col = helix['col']
-        scaf = helix['scaf']
-        stap = helix['stap']
-        insertions = helix['loop']
-        skips = helix['skip']
-        fromVh = part.virtualHelixAtCoord((row, col))
-        scafStrandSet = fromVh.scaffoldStrandSet()
-        stapStrandSet = fromVh.stapleStrandSet()
-        # install scaffold xovers
         for (idx5p, toVhNum, idx3p) in scaf_xo[vhNum]:
-            # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
-            strand5p = scafStrandSet.getStrand(idx5p)
-            toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
-            strand3p = toVh.scaffoldStrandSet().getStrand(idx3p)
-            part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
-        # install staple xovers
+            xovers.append((StrandType.Scaffold, vhNum, idx5p, toVhNum, idx3p))
         for (idx5p, toVhNum, idx3p) in stap_xo[vhNum]:
-            # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
-            strand5p = stapStrandSet.getStrand(idx5p)
-            toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
-            strand3p = toVh.stapleStrandSet().getStrand(idx3p)
-            part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
+            xovers.append((StrandType.Staple, vhNum, idx5p, toVhNum, idx3p))
+    # resolve both ends of every xover in a single address map lookup
+    # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
+    addresses = []
+    for strandType, vhNum, idx5p, toVhNum, idx3p in xovers:
+        addresses.append((partVhNum[vhNum], strandType, idx5p))
+        addresses.append((partVhNum[toVhNum], strandType, idx3p))
+    strands = part.strandsAt(addresses)
+    xoverArgs = []
+    for i, (strandType, vhNum, idx5p, toVhNum, idx3p) in enumerate(xovers):
+        strand5p, strand3p = strands[2 * i], strands[2 * i + 1]
+        xoverArgs.append((strand5p, idx5p, strand3p, idx3p))
+    # installed in one pass, so the oligos are merged once at the end
+    part.createXovers(xoverArgs, useUndoStack=False)
 
     # SET DEFAULT COLOR
+    # colors are collected here and in the stap_colors pass below, then
+    # applied at once so each oligo is only recolored once
+    oligoColors = {}
     for oligo in part.oligos():
         if oligo.isStaple():
             defaultColor = styles.DEFAULT_STAP_COLOR
         else:
             defaultColor = styles.DEFAULT_SCAF_COLOR
-        oligo.applyColor(defaultColor, useUndoStack=False)
+        oligoColors[oligo] = defaultColor
 
     # COLORS, INSERTIONS, SKIPS
     for helix in obj['vstrands']:
@@ -256,7 +258,8 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
         for baseIdx, colorNumber in helix['stap_colors']:
             color = QColor((colorNumber>>16)&0xFF, (colorNumber>>8)&0xFF, colorNumber&0xFF).name()
             strand = stapStrandSet.getStrand(baseIdx)
-            strand.oligo().applyColor(color, useUndoStack=False)
+            oligoColors[strand.oligo()] = color
+    part.applyColors(oligoColors, useUndoStack=False)
 
 def isSegmentStartOrEnd(strandType, vhNum, baseIdx, fiveVH, fiveIdx, threeVH, threeIdx):
     """Returns True if the base is a breakpoint or crossover."""
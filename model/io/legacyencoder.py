@@ -23,9 +23,13 @@
 # http://www.opensource.org/licenses/mit-license.php
 
 from os.path import basename
-from model.enum import StrandType
 
 def legacy_dict_from_doc(document, fname, helixOrderList):
+    """
+    Returns the legacy file dict for document. The "scaf" and "stap"
+    entries of each helix are flat arrays from
+    StrandSet.getLegacyFlatArray; write them with legacy_array_json.
+    """
     part = document.selectedPart()
     numBases = part.maxBaseIdx()+1
 
@@ -35,9 +39,10 @@ def legacy_dict_from_doc(document, fname, helixOrderList):
         vh = part.virtualHelixAtCoord((row, col))
         # insertions and skips
         insertionDict = part.insertions()[(row, col)]
-        insts = [0 for i in range(numBases)]
-        skips = [0 for i in range(numBases)]
-        for idx, insertion in insertionDict.iteritems():
+        insts = [0] * numBases
+        skips = [0] * numBases
+        for insertion in insertionDict.itervalues():
+            idx = insertion.idx()
             if insertion.isSkip():
                 skips[idx] = insertion.length()
             else:
@@ -53,8 +58,8 @@ def legacy_dict_from_doc(document, fname, helixOrderList):
         vhDict = {"row":row,
                   "col":col,
                   "num":vh.number(),
-                  "scaf":vh.getLegacyStrandSetArray(StrandType.Scaffold),
-                  "stap":vh.getLegacyStrandSetArray(StrandType.Staple),
+                  "scaf":vh.scaffoldStrandSet().getLegacyFlatArray(),
+                  "stap":stapStrandSet.getLegacyFlatArray(),
                   "loop":insts,
                   "skip":skips,
                   "scafLoop":[],
@@ -64,3 +69,11 @@ def legacy_dict_from_doc(document, fname, helixOrderList):
     bname = basename(str(fname))
     obj = {"name":bname , "vstrands":vhList}
     return obj
+
+def legacy_array_json(flat):
+    """
+    Returns the compact JSON for a flat legacy strand array, a list with
+    one [5' helix, 5' idx, 3' helix, 3' idx] list per base.
+    """
+    numBases = len(flat) / 4
+    return '[' + ','.join(['[%d,%d,%d,%d]'] * numBases) % tuple(flat) + ']'
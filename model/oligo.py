@@ -28,6 +28,7 @@
 
 import util
 import copy
+from bisect import bisect_left
 from strand import Strand
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
 util.qtWrapImport('QtCore', globals(), ['pyqtSignal', 'QObject'])
@@ -43,7 +44,27 @@ class Oligo(QObject):
 
     Commands that affect Strands (e.g. create, remove, merge, split) are also
     responsible for updating the affected Oligos.
+
+    Oligo membership is kept in a union-find forest over oligos. A strand's
+    _oligo is only a label: Strand.oligo() walks up from it to the root of
+    its tree and returns the oligo that root stands for. Joining two oligos
+    (_absorb) is then O(1) and is undone exactly with _unabsorb, rather than
+    relabelling every strand downstream of a crossover. Strands whose oligo
+    changes this way are not told one by one; the absorbed oligo emits
+    oligoIdentityChangedSignal once instead.
+
+    The oligo's strands in 5' to 3' order, with running sums of their
+    totalLength(), are cached on first use so that walks and length lookups
+    along the oligo are list and bisect operations. Anything that changes
+    an oligo's strands, their order or their lengths must call
+    _invalidateStrandCache(); Strand does so from its connection, oligo
+    and totalLength setters. Set CADNANO_CHECK_OLIGO_STRANDS=1 in the
+    environment to cross-check every cached table against a fresh walk.
     """
+    shortStapleLength = 18  # staples shorter than this are highlighted
+    longStapleLength = 50  # and so are staples longer than this
+    checkStrandCache = util.envFlag('CADNANO_CHECK_OLIGO_STRANDS')
+
     def __init__(self, part, color=None):
         super(Oligo, self).__init__(part)
         self._part = part
@@ -51,11 +72,20 @@ class Oligo(QObject):
         self._length = 0
         self._isLoop = False
         self._color = color if color else "#0066cc"
+        self._id = None  # row in the part's oligo table, see Part.addOligo
+        self._ufParent = None  # parent in the forest, None for a root
+        self._ufRank = 0
+        self._ufIdentity = self  # the oligo this node stands for as a root
+        self._ufRoot = self  # the root of the tree standing for this oligo
+        self._strandCache = None  # (strands 5' to 3', length sums, index)
+        self._topology = None  # cached topologyKey()
+        self._fingerprint = None
+        self._tally = None  # what the part's staple tallies hold for self
     # end def
 
     def __repr__(self):
         clsName = self.__class__.__name__
-        olgId = str(id(self))[-4:]
+        olgId = str(id(self))[-4:] if self._id is None else self._id
         strandType = "Stap" if self.isStaple() else "Scaf"
         vhNum = self._strand5p.strandSet().virtualHelix().number()
         idx = self._strand5p.idx5Prime()
@@ -92,6 +122,15 @@ class Oligo(QObject):
         return self._color
     # end def
 
+    def idNum(self):
+        """
+        Returns the oligo's row in its part's oligo table, or None if it was
+        never added to a part. While the oligo is out of the part its row is
+        free for new oligos; undo/redo brings it back with the same id.
+        """
+        return self._id
+    # end def
+
     def locString(self):
         vhNum = self._strand5p.strandSet().virtualHelix().number()
         idx = self._strand5p.idx5Prime()
@@ -108,6 +147,8 @@ class Oligo(QObject):
 
     def setStrand5p(self, strand):
         self._strand5p = strand
+        self._invalidateStrandCache()
+        self._retally()
     # end def
 
     def undoStack(self):
@@ -126,12 +167,19 @@ class Oligo(QObject):
     # end def
 
     def sequence(self):
+        """
+        Returns the sequence of the oligo 5' to 3', joined from the
+        sequences of its strands, or None if it has none. Each strand owns
+        its sequence as a str; there is no per-oligo buffer that strands
+        view into, since split, merge and crossover commands keep moving
+        strands between oligos.
+        """
         temp = self.strand5p()
         if not temp:
             return None
         if temp.sequence():
             return ''.join([Strand.sequence(strand) \
-                        for strand in self.strand5p().generator3pStrand()])
+                                                for strand in self.strands()])
         else:
             return None
     # end def
@@ -139,30 +187,84 @@ class Oligo(QObject):
     def sequenceExport(self):
         vhNum5p = self.strand5p().virtualHelix().number()
         idx5p = self.strand5p().idx5Prime()
-        seq = ''
         if self.isLoop():
             # print "A loop exists"
             raise Exception
-        for strand in self.strand5p().generator3pStrand():
-            seq = seq + Strand.sequence(strand, forExport=True)
-            if strand.connection3p() == None:  # last strand in the oligo
-                vhNum3p = strand.virtualHelix().number()
-                idx3p = strand.idx3Prime()
+        strands = self.strands()
+        seq = ''.join([Strand.sequence(strand, forExport=True) \
+                                                    for strand in strands])
+        vhNum3p = strands[-1].virtualHelix().number()
+        idx3p = strands[-1].idx3Prime()
         output = "%d[%d],%d[%d],%s,%s,%s\n" % \
-                (vhNum5p, idx5p, vhNum3p, idx3p, seq, len(seq), self._color)
+                (vhNum5p, idx5p, vhNum3p, idx3p, seq, len(seq), self.color())
         return output
     # end def
 
+    def fingerprint(self):
+        """
+        Returns the hash of topologyKey(). Cheap to compare, but use the
+        key itself where a collision would do harm, e.g. as a cache key.
+        This is a memoized hash of the whole key, not a rolling hash: any
+        edit of the oligo drops it, and the next call rehashes every strand.
+        """
+        fp = self._fingerprint
+        if fp is None:
+            fp = self._fingerprint = hash(self.topologyKey())
+        return fp
+    # end def
+
+    def topologyKey(self):
+        """
+        Returns the oligo's topology as a tuple: whether it is a loop and
+        the helix, strand type and span of each of its strands in 5' to 3'
+        order, with the insertions on them. Sequence and color are left
+        out. Undoing an edit restores the key the oligo had before it, so
+        data derived from the topology can be cached under it.
+        """
+        key = self._topology
+        if key is None:
+            key = self._topology = (self._isLoop, tuple(
+                        [strand._topologyKey() for strand in self.strands()]))
+        return key
+    # end def
+
+    def strands(self):
+        """
+        Returns the strands of the oligo ordered 5' to 3'. The list is the
+        cached one and must not be modified.
+        """
+        return self._strandTable()[0]
+    # end def
+
+    def strandAtLength(self, length):
+        """
+        Returns (strand, offset) for the base length bases from the 5' end
+        of the oligo, counting insertions, where offset is the position of
+        that base within strand's totalLength() (0 at its 5' end). Returns
+        None if length runs past the 3' end.
+        """
+        strands, sums, index = self._strandTable()
+        i = bisect_left(sums, length, 1)
+        if i == len(sums):
+            return None
+        return strands[i-1], length - sums[i-1] - 1
+    # end def
+
+    def lengthAtStrand(self, strand):
+        """
+        Returns the total length of the strands 5' of strand in the oligo,
+        the inverse of strandAtLength.
+        """
+        strands, sums, index = self._strandTable()
+        return sums[index[strand]]
+    # end def
+
     def shouldHighlight(self):
         if not self._strand5p:
             return False
         if self._strand5p.isScaffold():
             return False
-        if self.length() < 18:
-            return True
-        if self.length() > 50:
-            return True
-        return False
+        return self._isOffLength(self._length)
     # end def
 
     ### PUBLIC METHODS FOR EDITING THE MODEL ###
@@ -172,7 +274,7 @@ class Oligo(QObject):
     # end def
 
     def applyColor(self, color, useUndoStack=True):
-        if color == self._color:
+        if color == self.color():
             return  # oligo already has color
         c = Oligo.ApplyColorCommand(self, color)
         util.execCommandList(self, [c], desc="Color Oligo", useUndoStack=useUndoStack)
@@ -189,6 +291,8 @@ class Oligo(QObject):
 
     def setLoop(self, bool):
         self._isLoop = bool
+        self._topology = self._fingerprint = None
+        self._retally()
 
     ### PUBLIC SUPPORT METHODS ###
     def addToPart(self, part):
@@ -215,10 +319,7 @@ class Oligo(QObject):
         temp = self.strand5p()
         if not temp:
             return
-        length = 0
-        for strand in temp.generator3pStrand():
-            length += strand.totalLength()
-        self.setLength(length)
+        self.setLength(self._strandTable()[1][-1])
     # end def
 
     def removeFromPart(self):
@@ -235,12 +336,16 @@ class Oligo(QObject):
 
     def setColor(self, color):
         self._color = color
+        self._retally()
     # end def
 
     def setLength(self, length):
-        before = self.shouldHighlight()
+        oldLength = self._length
         self._length = length
-        if before != self.shouldHighlight():
+        self._retally()
+        strand5p = self._strand5p
+        if strand5p and not strand5p.isScaffold() and \
+                self._isOffLength(oldLength) != self._isOffLength(length):
             self.oligoSequenceClearedSignal.emit(self)
             self.oligoAppearanceChangedSignal.emit(self)
     # end def
@@ -250,11 +355,13 @@ class Oligo(QObject):
         This method sets the isLoop status of the oligo and the oligo's
         5' strand.
         """
+        self._invalidateStrandCache()
         # check loop status
         if oldStrandLow.oligo() == oldStrandHigh.oligo():
             self._isLoop = True
             self._strand5p = newStrand
-            return 
+            self._retally()
+            return
             # leave the _strand5p as is?
         # end if
 
@@ -270,6 +377,7 @@ class Oligo(QObject):
             else:
                 self._strand5p = newStrand
         # end if
+        self._retally()
     # end def
 
     def strandResized(self, delta):
@@ -288,8 +396,11 @@ class Oligo(QObject):
         """
         # if you split it can't be a loop
         self._isLoop = False
+        self._invalidateStrandCache()
+        oligo3p._invalidateStrandCache()
         if oldMergedStrand.oligo().isLoop():
             self._strand5p = newStrand3p
+            self._retally()
             return
         else:
             if oldMergedStrand.connection5p() == None:
@@ -298,9 +409,108 @@ class Oligo(QObject):
                 self._strand5p = oldMergedStrand.oligo()._strand5p
             oligo3p._strand5p = newStrand3p
         # end else
+        self._retally()
+        oligo3p._retally()
     # end def
 
     ### PRIVATE SUPPORT METHODS ###
+    def _strandTable(self):
+        table = self._strandCache
+        if table is None:
+            table = self._strandCache = self._buildStrandTable()
+        elif self.checkStrandCache:
+            computed = self._buildStrandTable()
+            if computed[:2] != table[:2]:
+                raise AssertionError("%s stale strand cache" % self)
+        return table
+    # end def
+
+    def _buildStrandTable(self):
+        strands = []
+        sums = [0]
+        total = 0
+        if self._strand5p is not None:
+            for strand in self._strand5p.generator3pStrand():
+                strands.append(strand)
+                total += strand.totalLength()
+                sums.append(total)
+        index = dict((strand, i) for i, strand in enumerate(strands))
+        return strands, sums, index
+    # end def
+
+    def _isOffLength(self, length):
+        return length < self.shortStapleLength or \
+                                            length > self.longStapleLength
+    # end def
+
+    def _retally(self):
+        """Updates the part's oligo table and tallies, if they hold self."""
+        if self._tally is not None:
+            self._part._tallyOligo(self)
+    # end def
+
+    def _invalidateStrandCache(self):
+        self._strandCache = None
+        self._topology = self._fingerprint = None
+    # end def
+
+    def _absorb(self, oligo):
+        """
+        Merges the strands of oligo into this oligo, by linking the roots
+        of their trees (union by rank). Returns a token for _unabsorb.
+        """
+        a, b = self._ufRoot, oligo._ufRoot
+        assert a is not b
+        if a._ufRank < b._ufRank:
+            a, b = b, a
+        token = (a, b, a._ufRank, a._ufIdentity, self._ufRoot)
+        b._ufParent = a
+        if a._ufRank == b._ufRank:
+            a._ufRank += 1
+        a._ufIdentity = self
+        self._ufRoot = a
+        self._invalidateStrandCache()
+        oligo._invalidateStrandCache()
+        return token
+    # end def
+
+    def _relabel(self, strands, relabelled, emitSignal=True):
+        """
+        Labels strands with this oligo, recording each strand and its
+        previous label in relabelled for _restoreLabels. Unlike _absorb this
+        touches every strand, which splits can't avoid.
+        """
+        for strand in strands:
+            relabelled.append((strand, strand._oligo))
+            Strand.setOligo(strand, self, emitSignal)
+    # end def
+
+    @staticmethod
+    def _restoreLabels(relabelled, emitSignal=True):
+        """
+        Gives the strands recorded by _relabel back their exact previous
+        labels, which undoing earlier merges relies on, and empties
+        relabelled.
+        """
+        for strand, label in reversed(relabelled):
+            Strand.setOligo(strand, label, emitSignal)
+        del relabelled[:]
+    # end def
+
+    def _unabsorb(self, token):
+        """
+        Reverts the _absorb that returned token. Absorbs must be undone in
+        reverse order, which the undo stack guarantees.
+        """
+        a, b, rank, identity, root = token
+        b._ufParent = None
+        a._ufRank = rank
+        a._ufIdentity = identity
+        self._ufRoot = root
+        self._invalidateStrandCache()
+        identity._invalidateStrandCache()
+        b._ufIdentity._invalidateStrandCache()
+    # end def
 
     ### COMMANDS ###
     class ApplyColorCommand(QUndoCommand):
@@ -334,36 +544,26 @@ class Oligo(QObject):
         # end def
 
         def redo(self):
-            olg = self._oligo
-            nS = ''.join(self._newSequence) if self._newSequence else None
-            nS_original = self._newSequence
-            oligoList = [olg]
-            for strand in olg.strand5p().generator3pStrand():
-                usedSeq, nS = strand.setSequence(nS)
-                # get the compliment ahead of time
-                usedSeq = util.comp(usedSeq) if usedSeq else None
-                compSS = strand.strandSet().complementStrandSet()
-                for compStrand in compSS._findOverlappingRanges(strand):
-                    subUsedSeq = compStrand.setComplementSequence(usedSeq, strand)
-                    oligoList.append(compStrand.oligo())
-                # end for
-                # as long as the new Applied Sequence is not None
-                if nS == None and nS_original:
-                    break
-            # end for
-            for oligo in oligoList:
-                oligo.oligoSequenceAddedSignal.emit(oligo)
+            self._applySequence(self._newSequence)
         # end def
 
         def undo(self):
-            olg = self._oligo
-            oS = ''.join(self._oldSequence) if self._oldSequence else None
+            self._applySequence(self._oldSequence)
+        # end def
 
+        def _applySequence(self, sequence):
+            """
+            Pads sequence to the oligo length once and hands every strand
+            its slice of it by the oligo's cached length sums, instead of
+            carrying the unused remainder from strand to strand.
+            """
+            olg = self._oligo
+            strands, sums, index = olg._strandTable()
+            seq = ''.join(sequence).ljust(sums[-1]) if sequence else None
             oligoList = [olg]
-
-            for strand in olg.strand5p().generator3pStrand():
-                usedSeq, oS = strand.setSequence(oS)
-
+            for i, strand in enumerate(strands):
+                usedSeq, unused = strand.setSequence(
+                                    seq[sums[i]:sums[i+1]] if seq else None)
                 # get the compliment ahead of time
                 usedSeq = util.comp(usedSeq) if usedSeq else None
                 compSS = strand.strandSet().complementStrandSet()
@@ -371,8 +571,7 @@ class Oligo(QObject):
                     subUsedSeq = compStrand.setComplementSequence(usedSeq, strand)
                     oligoList.append(compStrand.oligo())
                 # end for
-            # for
-
+            # end for
             for oligo in oligoList:
                 oligo.oligoSequenceAddedSignal.emit(oligo)
         # end def
@@ -415,10 +614,9 @@ class Oligo(QObject):
 
             for strand in s5p.generator3pStrand():
                 strandSet = strand.strandSet()
-                strandSet._doc.removeStrandFromSelection(strand)
                 isInSet, overlap, sSetIdx = strandSet._findIndexOfRangeFor(strand)
                 sIList.append(sSetIdx)
-                strandSet._strandList.pop(sSetIdx)
+                strandSet._removeFromStrandList(strand)
                 # Emit a signal to notify on completion
                 strand.strandRemovedSignal.emit(strand)
                 # for updating the Slice View displayed helices
@@ -426,6 +624,7 @@ class Oligo(QObject):
             # end def
             # set the 3p strand for the undo
             self._strand3p = strand
+            part._invalidateXoverStrands(s5p.generator3pStrand())
 
             # remove Oligo from part but don't set parent to None?
             # o.removeFromPart()
@@ -441,12 +640,13 @@ class Oligo(QObject):
             for strand in s3p.generator5pStrand():
                 strandSet = strand.strandSet()
                 sSetIdx = sIList.pop(-1)
-                strandSet._strandList.insert(sSetIdx, strand)
+                strandSet._addToStrandList(strand, sSetIdx)
                 # Emit a signal to notify on completion
                 strandSet.strandsetStrandAddedSignal.emit(strandSet, strand)
                 # for updating the Slice View displayed helices
                 part.partStrandChangedSignal.emit(strandSet.part(), strandSet.virtualHelix())
             # end def
+            part._invalidateXoverStrands(s3p.generator5pStrand())
 
             # add Oligo to part but don't set parent to None?
             # o.addToPart(part)
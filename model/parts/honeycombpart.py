@@ -25,6 +25,13 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
+from array import array
+from itertools import izip
+from math import floor
+try:
+    import numpy
+except ImportError:  # positions are then computed in pure Python
+    numpy = None
 from cadnano import app
 from part import Part
 from model.enum import LatticeType
@@ -72,33 +79,24 @@ class HoneycombPart(Part):
         return (row % 2) ^ (column % 2)
     # end def
 
-    def getVirtualHelixNeighbors(self, virtualHelix):
+    def _neighborCoords(self, row, column):
         """
-        returns the list of neighboring virtualHelices based on parity of an
-        input virtualHelix
-
-        If a potential neighbor doesn't exist, None is returned in it's place
+        returns the coords of the neighbors of (row, column) based on its
+        parity; the order is important, it defines the directions p0, p1...
         """
-        neighbors = []
-        vh = virtualHelix
-        if vh == None:
-            return neighbors
-
-        # assign the method to a a local variable
-        getVH = self.virtualHelixAtCoord
-        # get the vh's row and column r,c
-        (r,c) = vh.coord()
-
+        r, c = row, column
         if self.isEvenParity(r, c):
-            neighbors.append(getVH((r,c+1)))  # p0 neighbor (p0 is a direction)
-            neighbors.append(getVH((r-1,c)))  # p1 neighbor
-            neighbors.append(getVH((r,c-1)))  # p2 neighbor
+            return (
+                    (r,c+1),  # p0 neighbor (p0 is a direction)
+                    (r-1,c),  # p1 neighbor
+                    (r,c-1),  # p2 neighbor
+                    )
         else:
-            neighbors.append(getVH((r,c-1)))  # p0 neighbor (p0 is a direction)
-            neighbors.append(getVH((r+1,c)))  # p1 neighbor
-            neighbors.append(getVH((r,c+1)))  # p2 neighbor
-        # For indices of available directions, use range(0, len(neighbors))
-        return neighbors  # Note: the order and presence of Nones is important
+            return (
+                    (r,c-1),  # p0 neighbor (p0 is a direction)
+                    (r+1,c),  # p1 neighbor
+                    (r,c+1),  # p2 neighbor
+                    )
     # end def
 
     def latticeCoordToPositionXY(self, row, column, scaleFactor=1.0):
@@ -113,16 +111,80 @@ class HoneycombPart(Part):
     # end def
 
     def positionToCoord(self, x, y, scaleFactor=1.0):
-        radius = self._radius
-        column = int(x/(radius*root3*scaleFactor) + 0.5)
+        """
+        Returns the (row, column) of the lattice point nearest to (x, y).
+        Any position snaps to a lattice point; this used to fall through
+        and return None.
+        """
+        rows, columns = self.positionsToCoords((x,), (y,), scaleFactor)
+        return rows[0], columns[0]
+    # end def
 
-        rowTemp = y/(radius*scaleFactor)
-        if (rowTemp % 3) + 0.5 > 1.0:
-            # odd parity
-            row = int((rowTemp-1)/3 + 0.5)
-        else:
-            # even parity
-            row = int(rowTemp/3 + 0.5)
+    def latticePositionsXY(self, rows, columns, scaleFactor=1.0):
+        radius = self._radius*scaleFactor
+        dx = radius*root3
+        if numpy is not None:
+            rows = numpy.asarray(rows, dtype=numpy.intp)
+            columns = numpy.asarray(columns, dtype=numpy.intp)
+            xs = columns*dx
+            ys = (rows*3 + ((rows ^ columns) & 1))*radius
+            return array('d', xs.astype('d').tostring()), \
+                   array('d', ys.astype('d').tostring())
+        xs = array('d', [column*dx for column in columns])
+        # odd parity helices sit one radius higher
+        ys = array('d', [(row*3 + ((row ^ column) & 1))*radius \
+                                    for row, column in izip(rows, columns)])
+        return xs, ys
+    # end def
+
+    def positionsToCoords(self, xs, ys, scaleFactor=1.0):
+        """
+        The nearest lattice point is in one of the two columns around x,
+        and within a column in one of the three rows around y.
+        """
+        radius = self._radius*scaleFactor
+        dx = radius*root3
+        if numpy is not None:
+            return self._positionsToCoordsNumpy(xs, ys, radius, dx)
+        rows, columns = array('i'), array('i')
+        for x, y in izip(xs, ys):
+            xc, yr = x/dx, y/radius
+            c0, r0 = int(floor(xc)), int(floor(yr/3))
+            best = None
+            for column in (c0, c0 + 1):
+                ddx = (xc - column)*root3
+                ddx *= ddx
+                for row in (r0 - 1, r0, r0 + 1):
+                    ddy = yr - row*3 - ((row ^ column) & 1)
+                    d = ddx + ddy*ddy
+                    if best is None or d < best:
+                        best, bestRow, bestColumn = d, row, column
+            rows.append(bestRow)
+            columns.append(bestColumn)
+        return rows, columns
+    # end def
+
+    # the candidate lattice points of positionsToCoords, in the order the
+    # loop above tries them, as offsets from (r0, c0)
+    _candidateRows = (-1, 0, 1, -1, 0, 1)
+    _candidateColumns = (0, 0, 0, 1, 1, 1)
+
+    def _positionsToCoordsNumpy(self, xs, ys, radius, dx):
+        """positionsToCoords for all positions at once with numpy."""
+        xc = numpy.asarray(xs, dtype='d')/dx
+        yr = numpy.asarray(ys, dtype='d')/radius
+        c0 = numpy.floor(xc).astype(numpy.intc)
+        r0 = numpy.floor(yr/3).astype(numpy.intc)
+        # one row per candidate, one column per position
+        columns = c0 + numpy.array(self._candidateColumns, numpy.intc)[:, None]
+        rows = r0 + numpy.array(self._candidateRows, numpy.intc)[:, None]
+        ddx = (xc - columns)*root3
+        ddy = yr - rows*3 - ((rows ^ columns) & 1)
+        # argmin picks the first of equally near candidates, like the loop
+        best = numpy.argmin(ddx*ddx + ddy*ddy, axis=0)
+        positions = numpy.arange(len(best))
+        return array('i', rows[best, positions].tostring()), \
+               array('i', columns[best, positions].tostring())
     # end def
 
     ########################## Archiving / Unarchiving #########################
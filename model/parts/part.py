@@ -26,9 +26,12 @@
 # http://www.opensource.org/licenses/mit-license.php
 
 from exceptions import KeyError
+from array import array
+from bisect import bisect_left, bisect_right
 from heapq import heapify, heappush, heappop
 from itertools import product, izip, islice
 from collections import defaultdict
+from contextlib import contextmanager
 import random
 
 from model.enum import StrandType
@@ -79,10 +82,57 @@ class Part(QObject):
         self._document = kwargs.get('document', None)
         super(Part, self).__init__(parent=self._document)
         # Data structure
+        # strands and insertions store base indices relative to _baseOffset,
+        # so adding bases at the low end only changes the offset; the
+        # public index of a base is its stored index plus _baseOffset
+        self._baseOffset = 0
         self._insertions = defaultdict(dict)  # dict of insertions per virtualhelix
+        # per virtualhelix: sorted insertion idxs, and the cumulative lengths
+        # of those insertions (sums[i] is the total length of the first i)
+        self._insertionIdxs = defaultdict(list)
+        self._insertionSums = defaultdict(lambda: [0])
         self._oligos = set()
+        # staple-quality tallies over the staple oligos in _oligos; each
+        # oligo re-records itself when its length, loop flag or 5' end
+        # change (see Oligo._retally)
+        self._stapleLengthCounts = defaultdict(int)  # length -> # staples
+        self._shortStapleOligos = set()
+        self._longStapleOligos = set()
+        self._stapleLoopOligos = set()
+        # oligo table: an oligo added to the part owns an integer id, its
+        # row in the parallel arrays below. The row of a removed oligo is
+        # freed for new oligos; commands remove oligos before adding others,
+        # so an oligo brought back by undo/redo finds its row free again and
+        # keeps its id
+        self._oligoById = []  # id -> oligo, None for a free row
+        self._freeOligoRows = set()
+        self._oligoInPart = array('b')  # 1 while the oligo is in _oligos
+        self._oligoTypes = array('b')  # StrandType of the 5' strand, or -1
+        self._oligoLengths = array('i')
+        self._oligoLoops = array('b')
+        self._oligoColorIdxs = array('i')  # indices into palette()
+        self._oligoStrands5p = []
+        self._palette = []  # palette index -> color
+        self._paletteIndex = {}  # color -> palette index
         self._coordToVirtualHelix = {}
         self._numberToVirtualHelix = {}
+        # lattice neighbors of every virtualhelix in the part, as a tuple
+        # ordered by direction (p0, p1, ...) with None for empty slots;
+        # kept up to date by _addVirtualHelix and _removeVirtualHelix
+        self._neighborTable = {}
+        # per-base strand owners for the whole part: every StrandSet gets
+        # a row of _ownerStride owner slots in _baseOwners (-1 is empty),
+        # and _ownerStrands maps a slot back to its strand. Base 0 is at
+        # column _ownerZero of a row; the columns around bases 0 to
+        # maxBaseIdx() are headroom for resizing (see _resizeBaseOwners)
+        self._baseOwners = array('i')
+        self._ownerStride = 0  # set when the first row is allocated
+        self._ownerZero = 0
+        self._ownerRowSets = []  # row -> StrandSet, None for a free row
+        self._freeOwnerRows = set()  # rows of removed helices
+        self._ownerStrands = []  # slot -> strand, or None when free
+        self._ownerSlots = {}  # strand -> slot
+        self._freeOwnerSlots = []
         # Dimensions
         self._maxRow = 50  # subclass overrides based on prefs
         self._maxCol = 50
@@ -98,6 +148,17 @@ class Part(QObject):
         self._activeBaseIndex = self._step
         self._activeVirtualHelix = None
         self._activeVirtualHelixIdx = None
+        # sorted crossover-site tables of the lattice, built per part length
+        self._xoverSiteTables = {}  # (strandType, neighbor, isLowIdx) -> array
+        self._xoverSiteMaxBase = None  # the _maxBase the tables were built for
+        # crossover candidates per helix: {vh: {(neighborIdx, strandType):
+        # (neighbor, (lowSites, highSites))}}, sites free of crossovers
+        self._xoverCandidateCache = {}
+        self._xoverCandidateMaxBase = None
+        self._xoverCandidateHits = 0
+        self._xoverCandidateMisses = 0
+        self._batchDepth = 0  # nesting level of batchEdit()
+        self._batchStrands = None  # strands with deferred oligo updates
 
     # end def
 
@@ -218,26 +279,181 @@ class Part(QObject):
     # end def
 
     def insertions(self):
-        """Return dictionary of insertions."""
+        """
+        Return dictionary of insertions. The per-virtualhelix dicts are
+        keyed by stored index; use insertionAt to look up a public index.
+        """
         return self._insertions
     # end def
 
+    def insertionAt(self, coord, idx):
+        """
+        Returns the insertion of the virtualhelix at coord at idx, or None.
+        """
+        return self._insertions[coord].get(idx - self._baseOffset)
+    # end def
+
+    def insertionsBetweenIdxs(self, coord, idxLow, idxHigh):
+        """
+        Returns the insertions of the virtualhelix at coord that lie in
+        [idxLow, idxHigh], sorted by idx.
+        """
+        idxs = self._insertionIdxs.get(coord)
+        if not idxs:
+            return []
+        insertionsDict = self._insertions[coord]
+        offset = self._baseOffset
+        i = bisect_left(idxs, idxLow - offset)
+        j = bisect_right(idxs, idxHigh - offset)
+        return [insertionsDict[idx] for idx in idxs[i:j]]
+    # end def
+
+    def insertionLengthBetweenIdxs(self, coord, idxLow, idxHigh):
+        """
+        Returns the summed length of the insertions (negative for skips) of
+        the virtualhelix at coord that lie in [idxLow, idxHigh].
+        """
+        idxs = self._insertionIdxs.get(coord)
+        if not idxs:
+            return 0
+        sums = self._insertionSums[coord]
+        offset = self._baseOffset
+        return sums[bisect_right(idxs, idxHigh - offset)] - \
+                                    sums[bisect_left(idxs, idxLow - offset)]
+    # end def
+
     def isEvenParity(self, row, column):
         """Should be overridden when subclassing."""
         raise NotImplementedError
     # end def
 
+    def latticePositionsXY(self, rows, columns, scaleFactor=1.0):
+        """
+        Array version of latticeCoordToPositionXY. Returns the arrays xs, ys
+        of the positions of the lattice coords (rows[i], columns[i]).
+        Should be overridden when subclassing.
+        """
+        raise NotImplementedError
+    # end def
+
+    def positionsToCoords(self, xs, ys, scaleFactor=1.0):
+        """
+        Array version of positionToCoord. Returns the arrays rows, columns
+        of the lattice coords nearest to the positions (xs[i], ys[i]); the
+        coords are not clipped to the lattice dimensions.
+        Should be overridden when subclassing.
+        """
+        raise NotImplementedError
+    # end def
+
+    def spatialLattice(self, scaleFactor=1.0):
+        """
+        Returns the arrays rows, columns, xs, ys of every lattice point, in
+        the order of generatorFullLattice, computed in one call.
+        """
+        maxCol = self._maxCol
+        rows = array('i')
+        columns = array('i', range(maxCol)) * self._maxRow
+        for row in range(self._maxRow):
+            rows.extend([row] * maxCol)
+        xs, ys = self.latticePositionsXY(rows, columns, scaleFactor)
+        return rows, columns, xs, ys
+    # end def
+
+    def getVirtualHelixNeighbors(self, virtualHelix):
+        """
+        returns the tuple of neighboring virtualHelices based on parity of
+        an input virtualHelix
+
+        If a potential neighbor doesn't exist, None is returned in it's place
+        """
+        if virtualHelix == None:
+            return ()
+        try:
+            return self._neighborTable[virtualHelix]
+        except KeyError:  # not (or no longer) in the part
+            return self._lookupNeighbors(virtualHelix.coord())
+    # end def
+
+    def neighborAdjacency(self):
+        """
+        Returns (vhs, adjacency) for graph algorithms over the lattice: vhs
+        lists the virtualHelices sorted by coord, and adjacency is a flat
+        array with one row per helix of the vhs index of the neighbor in
+        each direction, or -1 where there is none.
+        """
+        vhs = sorted(self._neighborTable, key=lambda vh: vh.coord())
+        position = dict((vh, i) for i, vh in enumerate(vhs))
+        adjacency = array('i')
+        for vh in vhs:
+            adjacency.extend([-1 if nb is None else position[nb] \
+                                            for nb in self._neighborTable[vh]])
+        return vhs, adjacency
+    # end def
+
+    def oligoById(self, idNum):
+        """Returns the oligo with id idNum (see Oligo.idNum), or None."""
+        return self._oligoById[idNum]
+
+    def palette(self):
+        """Returns the list of colors that the oligo table's colorIdx
+        column refers to."""
+        return self._palette
+
+    def oligoTable(self):
+        """
+        Returns the oligo table as a dict of parallel sequences indexed by
+        oligo id: 'inPart', 'strandType', 'length', 'isLoop', 'colorIdx'
+        (into palette()) and 'strand5p'. Free rows, left by oligos that were
+        removed from the part, have inPart 0. The sequences are live; don't
+        modify.
+        """
+        return {'inPart': self._oligoInPart,
+                'strandType': self._oligoTypes,
+                'length': self._oligoLengths,
+                'isLoop': self._oligoLoops,
+                'colorIdx': self._oligoColorIdxs,
+                'strand5p': self._oligoStrands5p}
+
+    def xoverCandidateCacheStats(self):
+        """
+        Returns the hit and miss counts and the number of cached entries
+        of the crossover candidate cache behind potentialCrossoverList.
+        """
+        return {'hits': self._xoverCandidateHits,
+                'misses': self._xoverCandidateMisses,
+                'entries': sum([len(entries) for entries in \
+                                self._xoverCandidateCache.itervalues()])}
+
     def getStapleLoopOligos(self):
         """
         Returns staple oligos with no 5'/3' ends. Used by
         actionExportStaplesSlot in documentcontroller to validate before
         exporting staple sequences.
         """
-        stapLoopOlgs = []
-        for o in list(self.oligos()):
-            if o.isStaple() and o.isLoop():
-                stapLoopOlgs.append(o)
-        return stapLoopOlgs
+        return list(self._stapleLoopOligos)
+
+    def getShortStapleOligos(self):
+        """Returns staple oligos shorter than Oligo.shortStapleLength."""
+        return list(self._shortStapleOligos)
+
+    def getLongStapleOligos(self):
+        """Returns staple oligos longer than Oligo.longStapleLength."""
+        return list(self._longStapleOligos)
+
+    def stapleLengthHistogram(self):
+        """Returns a dict mapping staple length to its number of oligos."""
+        return dict(self._stapleLengthCounts)
+
+    def stapleStats(self):
+        """
+        Returns the number of staple oligos in total, too short, too long
+        and looped, read from tallies kept up to date on every edit.
+        """
+        return {'total': sum(self._stapleLengthCounts.itervalues()),
+                'short': len(self._shortStapleOligos),
+                'long': len(self._longStapleOligos),
+                'loops': len(self._stapleLoopOligos)}
 
     def hasVirtualHelixAtCoord(self, coord):
         return coord in self._coordToVirtualHelix
@@ -251,6 +467,14 @@ class Part(QObject):
         return self._minBase
     # end def
 
+    def baseOffset(self):
+        """
+        Returns the amount to add to a stored base index to get its public
+        index. Only Strand, StrandSet and Insertion should need this.
+        """
+        return self._baseOffset
+    # end def
+
     def numberOfVirtualHelices(self):
         return len(self._coordToVirtualHelix)
     # end def
@@ -259,6 +483,66 @@ class Part(QObject):
         return self._radius
     # end def
 
+    def strandAt(self, vhNum, strandType, baseIdx):
+        """
+        Returns the strand at the address (vhNum, strandType, baseIdx), or
+        None if there is no such virtualhelix or the base is empty.
+        """
+        return self.strandsAt(((vhNum, strandType, baseIdx),))[0]
+    # end def
+
+    def strandSetsOccupiedAt(self, baseIdx, strandType=None):
+        """
+        Returns the StrandSets, optionally only those of strandType, that
+        have a strand at baseIdx. Reads a single column of the owner map,
+        so the cost does not depend on how many strands there are.
+        """
+        if not 0 <= baseIdx <= self._maxBase:
+            return []
+        ret = []
+        column = self._baseOwners[self._ownerZero + baseIdx::self._ownerStride]
+        for strandSet, slot in izip(self._ownerRowSets, column):
+            if slot == -1:  # also every base of a free row
+                continue
+            if strandType is None or strandSet._strandType == strandType:
+                ret.append(strandSet)
+        return ret
+    # end def
+
+    def strandsAt(self, addresses):
+        """
+        Batch version of strandAt. Returns a list holding the strand (or
+        None) for each (vhNum, strandType, baseIdx) in addresses.
+        """
+        numToVh = self._numberToVirtualHelix
+        owners = self._baseOwners
+        ownerStrands = self._ownerStrands
+        stride, zero = self._ownerStride, self._ownerZero
+        maxBase = self._maxBase
+        rowOffsets = {}  # (vhNum, strandType) -> offset of base 0 in owners
+        ret = []
+        for vhNum, strandType, baseIdx in addresses:
+            key = (vhNum, strandType)
+            offset = rowOffsets.get(key)
+            if offset is None:
+                vh = numToVh.get(vhNum)
+                if vh is None:
+                    offset = -1
+                else:
+                    strandSet = vh.getStrandSetByType(strandType)
+                    row = strandSet._ownerRow
+                    # a removed helix may still have its number
+                    offset = row * stride + zero \
+                            if self._ownerRowSets[row] is strandSet else -1
+                rowOffsets[key] = offset
+            if offset == -1 or not 0 <= baseIdx <= maxBase:
+                ret.append(None)
+                continue
+            slot = owners[offset + baseIdx]
+            ret.append(ownerStrands[slot] if slot != -1 else None)
+        return ret
+    # end def
+
     def helicalPitch(self):
         return self._helicalPitch
     # end def
@@ -319,93 +603,86 @@ class Part(QObject):
             stapSS = vh.stapleStrandSet()
             epDict[stapSS] = []
             for i in range(len(segments)):
-                lo, hi = segments[i]
                 epDict[stapSS].extend(segments[i])
-                c = StrandSet.CreateStrandCommand(stapSS, lo, hi, i)
-                cmds.append(c)
-        util.execCommandList(part, cmds, desc="Add tmp strands", useUndoStack=False)
-        cmds = []
+            if segments:
+                stapSS.createStrands(segments, useUndoStack=False)
 
         # determine where xovers should be installed
+        Scaf, Stap = StrandType.Scaffold, StrandType.Staple
         for vh in part.getVirtualHelices():
             stapSS = vh.stapleStrandSet()
-            scafSS = vh.scaffoldStrandSet()
-            is5to3 = stapSS.isDrawn5to3()
-            potentialXovers = part.potentialCrossoverList(vh)
-            for neighborVh, idx, strandType, isLowIdx in potentialXovers:
-                if strandType != StrandType.Staple:
+            if not stapSS.isDrawn5to3():
+                continue
+            vhNum = vh.number()
+            candidates = [(neighborVh, idx) for neighborVh, idx, strandType,\
+                            isLowIdx in part.potentialCrossoverList(vh)\
+                            if strandType == Stap and isLowIdx]
+            # staple strands on both helices, and the scaffold strands
+            # nearby, for every candidate in a single batch lookup
+            addresses = []
+            for neighborVh, idx in candidates:
+                nNum = neighborVh.number()
+                addresses.extend(((vhNum, Stap, idx), (nNum, Stap, idx),
+                                  (vhNum, Scaf, idx-4), (vhNum, Scaf, idx+5)))
+            strands = part.strandsAt(addresses)
+            for i, (neighborVh, idx) in enumerate(candidates):
+                strand, nStrand, scafStrandL, scafStrandH = strands[4*i:4*i+4]
+                if strand == None or nStrand == None:
                     continue
-                if isLowIdx and is5to3:
-                    strand = stapSS.getStrand(idx)
-                    neighborSS = neighborVh.stapleStrandSet()
-                    nStrand = neighborSS.getStrand(idx)
-                    if strand == None or nStrand == None:
-                        continue
-                    # check for bases on both strands at [idx-1:idx+3]
-                    if not (strand.lowIdx() < idx and strand.highIdx() > idx + 1):
+                # check for bases on both strands at [idx-1:idx+3]
+                if not (strand.lowIdx() < idx and strand.highIdx() > idx + 1):
+                    continue
+                if not (nStrand.lowIdx() < idx and nStrand.highIdx() > idx + 1):
+                    continue
+
+                # check for nearby scaffold xovers
+                if scafStrandL:
+                    if scafStrandL.hasXoverAt(idx-4):
                         continue
-                    if not (nStrand.lowIdx() < idx and nStrand.highIdx() > idx + 1):
+                if scafStrandH:
+                    if scafStrandH.hasXoverAt(idx+5):
                         continue
-
-                    # check for nearby scaffold xovers
-                    scafStrandL = scafSS.getStrand(idx-4)
-                    scafStrandH = scafSS.getStrand(idx+5)
-                    if scafStrandL:
-                        if scafStrandL.hasXoverAt(idx-4):
-                            continue
-                    if scafStrandH:
-                        if scafStrandH.hasXoverAt(idx+5):
-                            continue
-                    # Finally, add the xovers to install
-                    epDict[stapSS].extend([idx, idx+1])
-                    epDict[neighborSS].extend([idx, idx+1])
+                # Finally, add the xovers to install
+                epDict[stapSS].extend([idx, idx+1])
+                epDict[neighborVh.stapleStrandSet()].extend([idx, idx+1])
 
         # clear temporary staple strands
         for vh in part.getVirtualHelices():
             stapSS = vh.stapleStrandSet()
-            for strand in stapSS:
-                c = StrandSet.RemoveStrandCommand(stapSS, strand, 0)
-                cmds.append(c)
-        util.execCommandList(part, cmds, desc="Rm tmp strands", useUndoStack=False)
-        cmds = []
+            stapSS.removeAllStrands(useUndoStack=False)
 
         util.beginSuperMacro(part, desc="Auto-Staple")
 
         for stapSS, epList in epDict.iteritems():
             assert (len(epList) % 2 == 0)
             epList = sorted(epList)
-            ssIdx = 0
-            for i in range(0, len(epList),2):
-                lo, hi = epList[i:i+2]
-                c = StrandSet.CreateStrandCommand(stapSS, lo, hi, ssIdx)
-                cmds.append(c)
-                ssIdx += 1
-        util.execCommandList(part, cmds, desc="Create strands")
-        cmds = []
+            if epList:
+                stapSS.createStrands(zip(epList[::2], epList[1::2]))
 
         # create crossovers wherever possible (from strand5p only)
+        xovers = []
         for vh in part.getVirtualHelices():
             stapSS = vh.stapleStrandSet()
             is5to3 = stapSS.isDrawn5to3()
-            potentialXovers = part.potentialCrossoverList(vh)
-            for neighborVh, idx, strandType, isLowIdx in potentialXovers:
-                if strandType != StrandType.Staple:
+            vhNum = vh.number()
+            candidates = [(neighborVh, idx) for neighborVh, idx, strandType,\
+                            isLowIdx in part.potentialCrossoverList(vh)\
+                            if strandType == Stap and isLowIdx == is5to3]
+            addresses = []
+            for neighborVh, idx in candidates:
+                addresses.extend(((vhNum, Stap, idx),
+                                  (neighborVh.number(), Stap, idx)))
+            strands = part.strandsAt(addresses)
+            for i, (neighborVh, idx) in enumerate(candidates):
+                strand, nStrand = strands[2*i], strands[2*i+1]
+                if strand == None or nStrand == None:
                     continue
-                if (isLowIdx and is5to3) or (not isLowIdx and not is5to3):
-                    strand = stapSS.getStrand(idx)
-                    neighborSS = neighborVh.stapleStrandSet()
-                    nStrand = neighborSS.getStrand(idx)
-                    if strand == None or nStrand == None:
-                        continue
-                    if idx in strand.idxs() and idx in nStrand.idxs():
-                        # only install xovers on pre-split strands
-                        part.createXover(strand, idx, nStrand, idx, updateOligo=False)
-
-        c = Part.RefreshOligosCommand(part)
-        cmds.append(c)
-        util.execCommandList(part, cmds, desc="Assign oligos")
+                if idx in strand.idxs() and idx in nStrand.idxs():
+                    # only install xovers on pre-split strands
+                    xovers.append((strand, idx, nStrand, idx))
+        # one pass installs them all and merges their oligos
+        part.createXovers(xovers)
 
-        cmds = []
         util.endSuperMacro(part)
 
     # end def
@@ -517,9 +794,82 @@ class Part(QObject):
 
     def addOligo(self, oligo):
         self._oligos.add(oligo)
+        oid, oligoById = oligo._id, self._oligoById
+        if oid in self._freeOligoRows:  # its row from before, still free
+            self._freeOligoRows.remove(oid)
+            oligoById[oid] = oligo
+        elif oid is None or oid >= len(oligoById) or \
+                    oligoById[oid] is not oligo:
+            oid = oligo._id = self._allocOligoRow(oligo)
+        self._oligoInPart[oid] = 1
+        self._tallyOligo(oligo)
 
     # end def
 
+    def applyColors(self, oligoColors, useUndoStack=True):
+        """
+        Applies the colors in oligoColors ({oligo: color}) as one command,
+        so recoloring many oligos is a single undo step and each oligo
+        whose color changes is repainted once.
+        """
+        oligoColors = dict((olg, color) for olg, color in \
+                        oligoColors.iteritems() if olg.color() != color)
+        if not oligoColors:
+            return  # oligos already have their colors
+        c = Part.ApplyColorsCommand(self, oligoColors)
+        util.execCommandList(self, [c], desc="Color Oligos", \
+                                                useUndoStack=useUndoStack)
+    # end def
+
+    @contextmanager
+    def batchEdit(self, desc="Batch edit", useUndoStack=True):
+        """
+        Context for bulk edits:
+
+            with part.batchEdit("Import xovers"):
+                for args in xovers:
+                    part.createXover(*args)
+
+        Crossovers created inside the batch skip oligo merging and their
+        per-strand update signals; on leaving the outermost batch a single
+        RefreshOligosCommand reconciles the oligos of the strands they
+        touched, walking each affected strand chain once. With the undo
+        stack the batch is one macro.
+
+        Until then the oligos of those strands are stale, so a batch may
+        only join existing strand ends: createXover calls that would split
+        a strand or clear a scaffold sequence, and splits, merges, strand
+        and xover removal, raise AssertionError inside a batch. Use
+        createXovers for mid-strand xovers, it splits before connecting.
+        """
+        self._batchDepth += 1
+        if self._batchDepth == 1:
+            self._batchStrands = set()
+        if useUndoStack:
+            util.beginSuperMacro(self, desc)
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            if self._batchDepth == 0:
+                strands, self._batchStrands = self._batchStrands, None
+                if strands:
+                    c = Part.RefreshOligosCommand(self, strands)
+                    util.execCommandList(self, [c], desc="Assign oligos", \
+                                                    useUndoStack=useUndoStack)
+            if useUndoStack:
+                util.endSuperMacro(self)
+    # end def
+
+    def _assertNotInBatch(self, desc):
+        """
+        Edits that read oligo state, e.g. a split walks the oligo and needs
+        its loop flag, length and 5' end, are not supported in a batchEdit.
+        """
+        if self._batchDepth:
+            raise AssertionError("%s is not supported in a batchEdit" % desc)
+    # end def
+
     def createVirtualHelix(self, row, col, useUndoStack=True):
         c = Part.CreateVirtualHelixCommand(self, row, col)
         util.execCommandList(self, [c], desc="Add VirtualHelix", \
@@ -534,6 +884,9 @@ class Part(QObject):
         ss3p = strand3p.strandSet()
         if ss5p.strandType() != ss3p.strandType():
             return
+        if strand5p.idx3Prime() != idx5p or strand3p.idx5Prime() != idx3p or \
+                                    (ss5p.isScaffold() and useUndoStack):
+            self._assertNotInBatch("A splitting or scaffold createXover")
         if useUndoStack:
             self.undoStack().beginMacro("Create Xover")
         if ss5p.isScaffold() and useUndoStack:  # ignore on import
@@ -669,6 +1022,9 @@ class Part(QObject):
                     return
         # end else
 
+        if self._batchDepth:  # defer the oligo merge to the end of the batch
+            updateOligo = False
+            self._batchStrands.update((xoStrand5, xoStrand3))
         e = Part.CreateXoverCommand(self, xoStrand5, idx5p, xoStrand3, idx3p, updateOligo=updateOligo)
         if useUndoStack:
             self.undoStack().push(e)
@@ -678,7 +1034,110 @@ class Part(QObject):
 
     # end def
 
+    def createXovers(self, xovers, useUndoStack=True):
+        """
+        Bulk version of createXover for a list of (strand5p, idx5p,
+        strand3p, idx3p) tuples, e.g. from a file import or autoStaple.
+
+        The splits every xover needs are planned against the current
+        strands first and then applied per strand set from the highest
+        base index down, so a split never shifts the strand set index of
+        a strand still waiting to be split. The connections are installed
+        without oligo updates and one RefreshOligosCommand reconciles the
+        touched strand chains at the end; the whole call is one undo step.
+        Like createXover, it clears the applied sequences of the scaffold
+        oligos it connects, with or without the undo stack.
+
+        Xovers that can't be made are skipped, like in createXover: ends
+        of different strand types, ends that already have a xover (or are
+        claimed twice), and splits on an endpoint, next to a 3' end or
+        next to another planned split of the same strand.
+
+        Returns the list of (strand5p, strand3p) pairs that were connected.
+        Not supported inside a batchEdit.
+        """
+        self._assertNotInBatch("createXovers")
+        # 1. plan the splits: a split at idx leaves a 3' end at idx
+        ends = set()  # claimed (strandSet, idx, is3p) xover ends
+        splits = {}  # strand -> planned split indices within it
+        planned = []  # (strandSet5p, idx5p, strandSet3p, idx3p)
+        for strand5p, idx5p, strand3p, idx3p in xovers:
+            ss5p = strand5p.strandSet()
+            ss3p = strand3p.strandSet()
+            if ss5p.strandType() != ss3p.strandType():
+                continue
+            end5p, end3p = (ss5p, idx5p, True), (ss3p, idx3p, False)
+            if end5p in ends or end3p in ends:
+                continue
+            needed = []
+            if strand5p.idx3Prime() != idx5p:
+                needed.append((strand5p, idx5p))
+            elif strand5p.connection3p() is not None:
+                continue
+            if strand3p.idx5Prime() != idx3p:
+                offset3p = -1 if ss3p.isDrawn5to3() else 1
+                needed.append((strand3p, idx3p + offset3p))
+            elif strand3p.connection5p() is not None:
+                continue
+            added = []
+            for strand, idx in needed:
+                idxs = splits.setdefault(strand, [])
+                if idx in idxs:  # shared with an already planned xover
+                    continue
+                if not strand.strandSet().strandCanBeSplit(strand, idx) or \
+                                    any(abs(idx - i) < 2 for i in idxs):
+                    break
+                idxs.append(idx)
+                added.append((strand, idx))
+            else:
+                ends.update((end5p, end3p))
+                planned.append((ss5p, idx5p, ss3p, idx3p))
+                continue
+            for strand, idx in added:  # can't split, undo the plan
+                splits[strand].remove(idx)
+        # end for
+        if not planned:
+            return []
+        splitIdxs = defaultdict(list)  # strandSet -> split indices
+        for strand, idxs in splits.iteritems():
+            splitIdxs[strand.strandSet()].extend(idxs)
+
+        if useUndoStack:
+            run = self.undoStack().push
+        else:
+            run = lambda c: c.redo()
+        ret = []
+        with self.batchEdit("Create Xovers", useUndoStack):
+            # nothing is pending until step 3, so the oligos are current
+            # clear the applied scaffold sequences, as createXover does
+            scafOligos = set()
+            for ss5p, idx5p, ss3p, idx3p in planned:
+                if ss5p.isScaffold():
+                    scafOligos.update((ss5p.getStrand(idx5p).oligo(), \
+                                       ss3p.getStrand(idx3p).oligo()))
+            for oligo in scafOligos:
+                if oligo.sequence() is not None:
+                    oligo.applySequence(None, useUndoStack)
+            # 2. split
+            for strandSet, idxs in splitIdxs.iteritems():
+                for idx in sorted(idxs, reverse=True):
+                    strand = strandSet.getStrand(idx)
+                    found, overlap, ssIdx = \
+                                    strandSet._findIndexOfRangeFor(strand)
+                    run(strandSet.SplitCommand(strand, idx, ssIdx))
+            # 3. install the xovers, the batch merges the oligos
+            for ss5p, idx5p, ss3p, idx3p in planned:
+                xoStrand5 = ss5p.getStrand(idx5p)
+                xoStrand3 = ss3p.getStrand(idx3p)
+                self._batchStrands.update((xoStrand5, xoStrand3))
+                run(Part.CreateXoverCommand(self, xoStrand5, idx5p, \
+                                    xoStrand3, idx3p, updateOligo=False))
+                ret.append((xoStrand5, xoStrand3))
+        return ret
+    # end def
+
     def removeXover(self, strand5p, strand3p, useUndoStack=True):
+        self._assertNotInBatch("removeXover")
         cmds = []
         if strand5p.connection3p() == strand3p:
             c = Part.RemoveXoverCommand(self, strand5p, strand3p)
@@ -705,38 +1164,51 @@ class Part(QObject):
         Returns a generator that yields the XY spatial lattice points to draw
         relative to the part origin.
         """
-        # nested for loop in one line
-        latticeCoordToPositionXY = self.latticeCoordToPositionXY
-        for latticeCoord in product(range(self._maxRow), range(self._maxCol)):
-            row, col = latticeCoord
-            x, y = latticeCoordToPositionXY(row, col, scaleFactor)
-            yield x, y, row, col
+        rows, columns, xs, ys = self.spatialLattice(scaleFactor)
+        return izip(xs, ys, rows, columns)
     # end def
 
     def getPreXoversHigh(self, strandType, neighborType, minIdx=0, maxIdx=None):
         """
         Returns all prexover positions for neighborType that are below
-        maxIdx. Used in emptyhelixitem.py.
+        maxIdx, step by step in lattice pattern order (not sorted). Used in
+        emptyhelixitem.py.
         """
-        preXO = self._scafH if strandType == StrandType.Scaffold else self._stapH
-        if maxIdx == None:
-            maxIdx = self._maxBase
-        steps = (self._maxBase / self._step) + 1
-        ret = [i * self._step + j for i in range(steps) for j in preXO[neighborType]]
-        return filter(lambda x: x >= minIdx and x <= maxIdx, ret)
+        sites = self._xoverSites(strandType, neighborType, False)
+        i, j = self._xoverSiteRange(sites, minIdx, maxIdx)
+        return sorted(sites[i:j], \
+                key=self._xoverSiteOrder(strandType, neighborType, False))
 
     def getPreXoversLow(self, strandType, neighborType, minIdx=0, maxIdx=None):
         """
         Returns all prexover positions for neighborType that are above
-        minIdx. Used in emptyhelixitem.py.
+        minIdx, step by step in lattice pattern order (not sorted). Used in
+        emptyhelixitem.py.
         """
-        preXO = self._scafL if strandType == StrandType.Scaffold \
-                                else self._stapL
-        if maxIdx == None:
-            maxIdx = self._maxBase
-        steps = (self._maxBase / self._step) + 1
-        ret = [i * self._step + j for i in range(steps) for j in preXO[neighborType]]
-        return filter(lambda x: x >= minIdx and x <= maxIdx, ret)
+        sites = self._xoverSites(strandType, neighborType, True)
+        i, j = self._xoverSiteRange(sites, minIdx, maxIdx)
+        return sorted(sites[i:j], \
+                key=self._xoverSiteOrder(strandType, neighborType, True))
+
+    def nearestPreXoverHigh(self, strandType, neighborType, idx, minIdx=0, maxIdx=None):
+        """
+        Returns the prexover position of getPreXoversHigh nearest to idx,
+        found by bisection; ties go to the one listed first, as with
+        util.nearest. Raises ValueError if there is none, as util.nearest
+        does on an empty list.
+        """
+        sites = self._xoverSites(strandType, neighborType, False)
+        return self._nearestXoverSite(sites, idx, minIdx, maxIdx, \
+                    self._xoverSiteOrder(strandType, neighborType, False))
+
+    def nearestPreXoverLow(self, strandType, neighborType, idx, minIdx=0, maxIdx=None):
+        """
+        Returns the prexover position of getPreXoversLow nearest to idx,
+        found by bisection. Raises ValueError if there is none.
+        """
+        sites = self._xoverSites(strandType, neighborType, True)
+        return self._nearestXoverSite(sites, idx, minIdx, maxIdx, \
+                    self._xoverSiteOrder(strandType, neighborType, True))
 
     def latticeCoordToPositionXY(self, row, col, scaleFactor=1.0):
         """
@@ -771,6 +1243,12 @@ class Part(QObject):
         # remove parts from self._oligos)
         try:
             self._oligos.remove(oligo)
+            self._untallyOligo(oligo)
+            oid = oligo._id
+            self._oligoInPart[oid] = 0
+            self._oligoStrands5p[oid] = None
+            self._oligoById[oid] = None
+            self._freeOligoRows.add(oid)
         except KeyError:
             print util.trace(5)
             # print "error removing oligo", oligo
@@ -837,7 +1315,11 @@ class Part(QObject):
     # end def
 
     def resizeVirtualHelices(self, minDelta, maxDelta, useUndoStack=True):
-        """docstring for resizeVirtualHelices"""
+        """
+        Adds minDelta bases at the low end and maxDelta bases at the high
+        end of every helix (negative deltas remove bases); see
+        ResizePartCommand.
+        """
         c = Part.ResizePartCommand(self, minDelta, maxDelta)
         util.execCommandList(self, [c], desc="Resize part", \
                                                     useUndoStack=useUndoStack)
@@ -881,10 +1363,10 @@ class Part(QObject):
         lo, hi = strand.idxs()
         if idx == lo:
             connectedStrand = strand.connectionLow()
-            preXovers = self.getPreXoversHigh
+            nearestPreXover = self.nearestPreXoverHigh
         else:
             connectedStrand = strand.connectionHigh()
-            preXovers = self.getPreXoversLow
+            nearestPreXover = self.nearestPreXoverLow
         connectedVh = connectedStrand.virtualHelix()
 
         # determine neighbor position, if any
@@ -892,12 +1374,11 @@ class Part(QObject):
         if connectedVh in neighbors:
             neighborIdx = neighbors.index(connectedVh)
             try:
-                newIdx = util.nearest(idx + delta,
-                                    preXovers(strandType,
-                                                neighborIdx,
-                                                minIdx=minIdx,
-                                                maxIdx=maxIdx)
-                                    )
+                newIdx = nearestPreXover(strandType,
+                                            neighborIdx,
+                                            idx + delta,
+                                            minIdx=minIdx,
+                                            maxIdx=maxIdx)
                 return newIdx
             except ValueError:
                 return None  # nearest not found in the expanded list
@@ -905,12 +1386,393 @@ class Part(QObject):
             return idx + delta
 
     ### PRIVATE SUPPORT METHODS ###
+    def _xoverSites(self, strandType, neighborIdx, isLowIdx):
+        """
+        Returns a sorted array of every base index up to maxBaseIdx() where
+        the lattice pattern puts a strandType crossover site toward the
+        neighbor in slot neighborIdx (as ordered by getVirtualHelixNeighbors)
+        on its low or high side. The tables are built once per part length.
+        """
+        tables = self._xoverSiteTables
+        if self._xoverSiteMaxBase != self._maxBase:
+            tables.clear()
+            self._xoverSiteMaxBase = self._maxBase
+        key = (strandType, neighborIdx, isLowIdx)
+        sites = tables.get(key)
+        if sites is None:
+            maxBase = self._maxBase
+            pattern = sorted(self._xoverPattern(strandType, neighborIdx, \
+                                                                isLowIdx))
+            sites = tables[key] = array('i', [i + j for i in \
+                        xrange(0, maxBase + 1, self._step) for j in pattern \
+                        if i + j <= maxBase])
+        return sites
+    # end def
+
+    def _xoverPattern(self, strandType, neighborIdx, isLowIdx):
+        """
+        Returns the lattice's list of crossover offsets within one step for
+        _xoverSites, in the lattice's own (unsorted) order.
+        """
+        if strandType == StrandType.Scaffold:
+            pts = self._scafL if isLowIdx else self._scafH
+        else:
+            pts = self._stapL if isLowIdx else self._stapH
+        return pts[neighborIdx]
+    # end def
+
+    def _xoverSiteOrder(self, strandType, neighborIdx, isLowIdx):
+        """
+        Returns a sort key that puts crossover sites in the order the
+        getPreXovers methods have always listed them: by step, then by
+        their offset's position in the lattice pattern.
+        """
+        step = self._step
+        pattern = self._xoverPattern(strandType, neighborIdx, isLowIdx)
+        rank = dict((j, r) for r, j in enumerate(pattern))
+        return lambda site: (site // step, rank[site % step])
+    # end def
+
+    def _xoverCandidates(self, vh, neighborIdx, neighbor, strandType):
+        """
+        Returns (lowSites, highSites): the strandType crossover sites of vh
+        toward neighbor, in slot neighborIdx, where neither helix has a
+        crossover yet. Entries are cached per helix until a strand edit
+        touches one of their sites (see _invalidateXoverCandidates).
+        """
+        cache = self._xoverCandidateCache
+        if self._xoverCandidateMaxBase != self._maxBase:
+            cache.clear()
+            self._xoverCandidateMaxBase = self._maxBase
+        key = (neighborIdx, strandType)
+        entries = cache.get(vh)
+        if entries is not None and key in entries:
+            self._xoverCandidateHits += 1
+            return entries[key][1]
+        self._xoverCandidateMisses += 1
+        blocked = vh.getStrandSetByType(strandType)._xoverIdxs() | \
+                        neighbor.getStrandSetByType(strandType)._xoverIdxs()
+        sitePair = tuple([[site for site in self._xoverSites(strandType, \
+                                neighborIdx, isLowIdx) if site not in blocked]
+                                for isLowIdx in (True, False)])
+        cache.setdefault(vh, {})[key] = (neighbor, sitePair)
+        return sitePair
+    # end def
+
+    def _xoverSiteRange(self, sites, minIdx, maxIdx):
+        """Returns (i, j) such that sites[i:j] lie in [minIdx, maxIdx]."""
+        if maxIdx == None:
+            maxIdx = self._maxBase
+        return bisect_left(sites, minIdx), bisect_right(sites, maxIdx)
+    # end def
+
+    def _nearestXoverSite(self, sites, idx, minIdx, maxIdx, order):
+        """
+        Returns the site in [minIdx, maxIdx] nearest to idx. On a tie it
+        returns the site that sorts first by order (see _xoverSiteOrder).
+        """
+        i, j = self._xoverSiteRange(sites, minIdx, maxIdx)
+        if i >= j:
+            raise ValueError("no prexover between %s and %s" % (minIdx, maxIdx))
+        k = min(max(bisect_left(sites, idx, i, j), i + 1), j - 1)
+        if k > i:
+            below, above = sites[k - 1], sites[k]
+            if idx - below < above - idx:
+                return below
+            elif idx - below == above - idx:
+                return min(below, above, key=order)
+        return sites[k]
+    # end def
+
+    def _invalidateXoverCandidates(self, strandSet, idxLow, idxHigh):
+        """
+        Drops the cached candidates that a change to the crossovers of
+        strandSet between idxLow and idxHigh can affect: those of its helix
+        and those of its neighbors toward it, if a site of theirs lies in
+        the range.
+        """
+        cache = self._xoverCandidateCache
+        if not cache:
+            return
+        vh = strandSet.virtualHelix()
+        strandType = strandSet.strandType()
+        owners = [vh] + [nb for nb in self.getVirtualHelixNeighbors(vh) if nb]
+        for owner in owners:
+            entries = cache.get(owner)
+            if not entries:
+                continue
+            for key, (neighbor, sitePair) in entries.items():
+                n, st = key
+                if st != strandType or (owner is not vh and neighbor is not vh):
+                    continue
+                for isLowIdx in (True, False):
+                    sites = self._xoverSites(st, n, isLowIdx)
+                    if bisect_left(sites, idxLow) < \
+                                            bisect_right(sites, idxHigh):
+                        del entries[key]
+                        break
+            # end for
+        # end for
+    # end def
+
+    def _invalidateXoverStrands(self, strands):
+        """
+        Drops the cached candidates that crossovers at the ends of strands
+        (None entries are skipped) can affect. Commands that add or remove
+        crossovers, or strands with crossovers, call it once per redo and
+        undo; the strand setters and the base owner map leave the cache
+        alone.
+        """
+        if self._xoverCandidateCache:
+            for strand in strands:
+                if strand is not None:
+                    self._invalidateXoverCandidates(strand.strandSet(), \
+                                                    *strand.idxs())
+    # end def
+
+    def _allocOligoRow(self, oligo):
+        """Returns the id of a free row of the oligo table, now oligo's."""
+        if self._freeOligoRows:
+            oid = self._freeOligoRows.pop()
+            self._oligoById[oid] = oligo
+            return oid
+        oid = len(self._oligoById)
+        self._oligoById.append(oligo)
+        self._oligoInPart.append(0)
+        self._oligoTypes.append(-1)
+        self._oligoLengths.append(0)
+        self._oligoLoops.append(0)
+        self._oligoColorIdxs.append(0)
+        self._oligoStrands5p.append(None)
+        return oid
+    # end def
+
+    def _paletteIdx(self, color):
+        """Returns the index of color in palette(), adding it if new."""
+        idx = self._paletteIndex.get(color)
+        if idx is None:
+            idx = self._paletteIndex[color] = len(self._palette)
+            self._palette.append(color)
+        return idx
+    # end def
+
+    def _tallyOligo(self, oligo):
+        """
+        Records oligo, which is in the part, in its oligo table row and in
+        the staple-quality tallies, replacing what was recorded before.
+        """
+        self._untallyOligo(oligo)
+        oid = oligo._id
+        strand5p = oligo._strand5p
+        self._oligoTypes[oid] = -1 if strand5p is None \
+                                            else strand5p.strandType()
+        self._oligoLengths[oid] = oligo._length
+        self._oligoLoops[oid] = oligo._isLoop
+        self._oligoColorIdxs[oid] = self._paletteIdx(oligo._color)
+        self._oligoStrands5p[oid] = strand5p
+        if strand5p is None or not strand5p.isStaple():
+            oligo._tally = ()  # in the part, but not counted
+            return
+        length = oligo._length
+        self._stapleLengthCounts[length] += 1
+        if length < Oligo.shortStapleLength:
+            self._shortStapleOligos.add(oligo)
+        elif length > Oligo.longStapleLength:
+            self._longStapleOligos.add(oligo)
+        if oligo._isLoop:
+            self._stapleLoopOligos.add(oligo)
+        oligo._tally = (length,)
+    # end def
+
+    def _untallyOligo(self, oligo):
+        tally = oligo._tally
+        if tally:
+            counts = self._stapleLengthCounts
+            length = tally[0]
+            counts[length] -= 1
+            if not counts[length]:
+                del counts[length]
+            self._shortStapleOligos.discard(oligo)
+            self._longStapleOligos.discard(oligo)
+            self._stapleLoopOligos.discard(oligo)
+        oligo._tally = None
+    # end def
+
+    def _allocBaseOwnerRow(self, strandSet):
+        """Returns an empty row of _baseOwners, now strandSet's."""
+        rowSets = self._ownerRowSets
+        if self._freeOwnerRows:
+            row = self._freeOwnerRows.pop()
+            rowSets[row] = strandSet
+            return row
+        if not rowSets:  # no headroom until the part is resized
+            self._ownerStride, self._ownerZero = self._maxBase + 1, 0
+        row = len(rowSets)
+        rowSets.append(strandSet)
+        self._baseOwners.extend(array('i', [-1]) * self._ownerStride)
+        return row
+    # end def
+
+    def _attachBaseOwnerRow(self, strandSet):
+        """
+        Gives strandSet, of a helix being added back to the part, its old
+        row of _baseOwners, or another one if its row was reused, and
+        claims the bases of the strands it still holds.
+        """
+        row, rowSets = strandSet._ownerRow, self._ownerRowSets
+        if rowSets[row] is strandSet:
+            return  # never left the part
+        if rowSets[row] is None:
+            rowSets[row] = strandSet
+            self._freeOwnerRows.discard(row)
+        else:
+            strandSet._ownerRow = self._allocBaseOwnerRow(strandSet)
+        strandSet._rebuildBaseOwners()
+    # end def
+
+    def _detachBaseOwnerRow(self, strandSet):
+        """
+        Frees the row of _baseOwners of strandSet, whose helix is leaving
+        the part, releasing the slots of any strands it still holds.
+        """
+        row = strandSet._ownerRow
+        for strand in strandSet._strandList:
+            if strand in self._ownerSlots:
+                self._releaseBaseOwners(row, strand)
+        self._ownerRowSets[row] = None
+        self._freeOwnerRows.add(row)
+    # end def
+
+    def _resizeBaseOwners(self, lowDelta, highDelta):
+        """
+        Adds lowDelta empty bases at the low end and highDelta at the high
+        end of every row of _baseOwners (negative deltas drop bases, which
+        must be empty). Called by ResizePartCommand before it changes
+        maxBaseIdx(). Slots are kept, so no strand is visited.
+
+        If the new bases fit in the headroom of the rows, only _ownerZero
+        moves; dropped bases are already empty and become headroom, so
+        undoing a resize never copies. Otherwise every row is copied into
+        a new layout with as much headroom as the new bases on each side
+        that ran out, so repeatedly growing the part copies the map a
+        logarithmic number of times.
+        """
+        self._xoverCandidateCache.clear()
+        if not self._ownerRowSets:
+            return  # the first row is laid out for the new size
+        oldStride, oldZero = self._ownerStride, self._ownerZero
+        length = self._maxBase + 1 + lowDelta + highDelta
+        zero = oldZero - lowDelta
+        highRoom = oldStride - zero - length
+        if zero >= 0 and highRoom >= 0:
+            self._ownerZero = zero
+            return
+        if zero < 0:
+            zero = length
+        stride = zero + length + (length if highRoom < 0 else highRoom)
+        # bases kept, in old public indices
+        start = max(-lowDelta, 0)
+        end = self._maxBase + 1 - max(-highDelta, 0)
+        owners = self._baseOwners
+        resized = array('i', [-1]) * (stride * len(self._ownerRowSets))
+        dst = zero + lowDelta + start
+        for src in xrange(oldZero + start, len(owners), oldStride):
+            resized[dst:dst + end - start] = owners[src:src + end - start]
+            dst += stride
+        self._baseOwners = resized
+        self._ownerStride, self._ownerZero = stride, zero
+    # end def
+
+    def _fillBaseOwners(self, row, idxLow, idxHigh, slot):
+        """Sets the owner of every base in [idxLow, idxHigh] to slot."""
+        offset = row * self._ownerStride + self._ownerZero
+        self._baseOwners[offset + idxLow:offset + idxHigh + 1] = \
+                                    array('i', [slot]) * (idxHigh - idxLow + 1)
+    # end def
+
+    def _claimBaseOwners(self, row, strand):
+        """Gives strand a slot and marks its bases in row as owned by it."""
+        if self._freeOwnerSlots:
+            slot = self._freeOwnerSlots.pop()
+            self._ownerStrands[slot] = strand
+        else:
+            slot = len(self._ownerStrands)
+            self._ownerStrands.append(strand)
+        self._ownerSlots[strand] = slot
+        self._fillBaseOwners(row, strand.lowIdx(), strand.highIdx(), slot)
+    # end def
+
+    def _releaseBaseOwners(self, row, strand):
+        """Marks the bases of strand in row as empty and frees its slot."""
+        slot = self._ownerSlots.pop(strand)
+        self._ownerStrands[slot] = None
+        self._freeOwnerSlots.append(slot)
+        self._fillBaseOwners(row, strand.lowIdx(), strand.highIdx(), -1)
+    # end def
+
+    def _moveBaseOwners(self, row, strand, idxs):
+        """Moves the bases owned by strand in row to the range idxs."""
+        slot = self._ownerSlots[strand]
+        self._fillBaseOwners(row, strand.lowIdx(), strand.highIdx(), -1)
+        self._fillBaseOwners(row, idxs[0], idxs[1], slot)
+    # end def
+
+    def _addInsertion(self, coord, insertion):
+        """
+        Stores insertion for the virtualhelix at coord and updates the
+        insertion index. Only called by the insertion commands.
+        """
+        idx, length = insertion._index, insertion.length()
+        self._insertions[coord][idx] = insertion
+        idxs, sums = self._insertionIdxs[coord], self._insertionSums[coord]
+        i = bisect_left(idxs, idx)
+        idxs.insert(i, idx)
+        sums.insert(i + 1, sums[i])
+        for j in xrange(i + 1, len(sums)):
+            sums[j] += length
+    # end def
+
+    def _removeInsertion(self, coord, idx):
+        """Removes the insertion at coord, idx and updates the index."""
+        idx -= self._baseOffset
+        length = self._insertions[coord].pop(idx).length()
+        idxs, sums = self._insertionIdxs[coord], self._insertionSums[coord]
+        i = bisect_left(idxs, idx)
+        del idxs[i]
+        del sums[i + 1]
+        for j in xrange(i + 1, len(sums)):
+            sums[j] -= length
+    # end def
+
+    def _changeInsertionLength(self, coord, idx, length):
+        """Sets the length of the insertion at coord, idx."""
+        idx -= self._baseOffset
+        insertion = self._insertions[coord][idx]
+        delta = length - insertion.length()
+        insertion.setLength(length)
+        idxs, sums = self._insertionIdxs[coord], self._insertionSums[coord]
+        for j in xrange(bisect_left(idxs, idx) + 1, len(sums)):
+            sums[j] += delta
+    # end def
+
     def _addVirtualHelix(self, virtualHelix):
         """
         private method for adding a virtualHelix to the Parts data structure
         of virtualHelix references
         """
-        self._coordToVirtualHelix[virtualHelix.coord()] = virtualHelix
+        coord = virtualHelix.coord()
+        self._coordToVirtualHelix[coord] = virtualHelix
+        # a helix restored by undo keeps its number, so setNumber won't
+        # register it again
+        num = virtualHelix.number()
+        if num is not None:
+            self._numberToVirtualHelix[num] = virtualHelix
+        for strandSet in virtualHelix.getStrandSets():
+            self._attachBaseOwnerRow(strandSet)
+        neighbors = self._lookupNeighbors(coord)
+        self._neighborTable[virtualHelix] = neighbors
+        self._refreshNeighbors(neighbors)
+        self._xoverCandidateCache.clear()  # neighbors have changed
     # end def
 
     def _removeVirtualHelix(self, virtualHelix):
@@ -919,6 +1781,39 @@ class Part(QObject):
         of virtualHelix references
         """
         del self._coordToVirtualHelix[virtualHelix.coord()]
+        num = virtualHelix.number()
+        if self._numberToVirtualHelix.get(num) is virtualHelix:
+            self._numberToVirtualHelix[num] = None
+        for strandSet in virtualHelix.getStrandSets():
+            self._detachBaseOwnerRow(strandSet)
+        neighbors = self._neighborTable.pop(virtualHelix, ())
+        self._refreshNeighbors(neighbors)
+        self._xoverCandidateCache.clear()  # neighbors have changed
+    # end def
+
+    def _lookupNeighbors(self, coord):
+        """Returns the neighbors of the lattice position coord."""
+        getVH = self._coordToVirtualHelix.get
+        return tuple([getVH(c) for c in self._neighborCoords(*coord)])
+    # end def
+
+    def _neighborCoords(self, row, column):
+        """
+        Returns the coords of the lattice neighbors of (row, column), in
+        direction order. Should be overridden when subclassing.
+        """
+        raise NotImplementedError
+    # end def
+
+    def _refreshNeighbors(self, neighbors):
+        """
+        Updates the reverse links: the neighbor tuples of the helices in
+        neighbors, after a helix next to them was added or removed.
+        """
+        table = self._neighborTable
+        for nb in neighbors:
+            if nb is not None:
+                table[nb] = self._lookupNeighbors(nb.coord())
     # end def
 
     def _reserveHelixIDNumber(self, parityEven=True, requestedIDnum=None):
@@ -1098,60 +1993,29 @@ class Part(QObject):
         view) of a potential Xover site
         """
         vh = virtualHelix
-        ret = []  # LUT = Look Up Table
-        part = self
-        # these are the list of crossover points simplified
-        # they depend on whether the strandType is scaffold or staple
-        # create a list of crossover points for each neighbor of the form
-        # [(_scafL[i], _scafH[i], _stapL[i], _stapH[i]), ...]
-        lutsNeighbor = list(
-                            izip(
-                                part._scafL,
-                                part._scafH,
-                                part._stapL,
-                                part._stapH
-                                )
-                            )
-
+        ret = []
         sTs = (StrandType.Scaffold, StrandType.Staple)
-        numBases = part.maxBaseIdx()
-
-        # create a range for the helical length dimension of the Part,
-        # incrementing by the lattice step size.
-        baseRange = range(0, numBases, part._step)
+        numBases = self.maxBaseIdx()
+        step = self._step
 
+        # candidate indices lie in [lo, hi); with idx given, only the
+        # lattice periods starting within idx - 3 steps .. idx + 2 steps
+        lo, hi = 0, numBases
         if idx != None:
-            baseRange = filter(lambda x: x >= idx - 3 * part._step and \
-                                        x <= idx + 2 * part._step, baseRange)
+            lo = max(lo, -((3 * step - idx) // step) * step)
+            hi = min(hi, ((idx + 2 * step) // step + 1) * step)
 
-        fromStrandSets = vh.getStrandSets()
         neighbors = self.getVirtualHelixNeighbors(vh)
-
-        # print neighbors, lutsNeighbor
-        for neighbor, lut in izip(neighbors, lutsNeighbor):
+        for n, neighbor in enumerate(neighbors):
             if not neighbor:
                 continue
-
-            # now arrange again for iteration
-            # (_scafL[i], _scafH[i]), (_stapL[i], _stapH[i]) )
-            # so we can pair by StrandType
-            lutScaf = lut[0:2]
-            lutStap = lut[2:4]
-            lut = (lutScaf, lutStap)
-
-            toStrandSets = neighbor.getStrandSets()
-            for fromSS, toSS, pts, st in izip(fromStrandSets, toStrandSets, lut, sTs):
-                # test each period of each lattice for each StrandType
-                for pt, isLowIdx in izip(pts, (True, False)):
-                    for i, j in product(baseRange, pt):
-                        index = i + j
-                        if index < numBases:
-                            if fromSS.hasNoStrandAtOrNoXover(index) and \
-                                    toSS.hasNoStrandAtOrNoXover(index):
-                                ret.append((neighbor, index, st, isLowIdx))
-                            # end if
-                        # end if
-                    # end for
+            for st in sTs:
+                sitePair = self._xoverCandidates(vh, n, neighbor, st)
+                for sites, isLowIdx in izip(sitePair, (True, False)):
+                    i = bisect_left(sites, lo)
+                    j = bisect_left(sites, hi)
+                    ret.extend([(neighbor, index, st, isLowIdx) \
+                                            for index in sites[i:j]])
                 # end for
             # end for
         # end for
@@ -1171,6 +2035,31 @@ class Part(QObject):
         self.partVirtualHelicesReorderedSignal.emit(self, orderedCoordList)
 
     ### COMMANDS ###
+    class ApplyColorsCommand(QUndoCommand):
+        """Sets the colors of many oligos, given as {oligo: color}."""
+        def __init__(self, part, oligoColors):
+            super(Part.ApplyColorsCommand, self).__init__()
+            self._part = part
+            self._newColors = oligoColors
+            self._oldColors = dict((olg, olg.color()) for olg in oligoColors)
+        # end def
+
+        def redo(self):
+            self._applyColors(self._newColors)
+        # end def
+
+        def undo(self):
+            self._applyColors(self._oldColors)
+        # end def
+
+        def _applyColors(self, oligoColors):
+            for olg, color in oligoColors.iteritems():
+                olg.setColor(color)
+            for olg in oligoColors:
+                olg.oligoAppearanceChangedSignal.emit(olg)
+        # end def
+    # end class
+
     class CreateVirtualHelixCommand(QUndoCommand):
         def __init__(self, part, row, col):
             super(Part.CreateVirtualHelixCommand, self).__init__()
@@ -1228,6 +2117,7 @@ class Part(QObject):
             self._strand3pIdx = strand3pIdx
             self._oldOligo3p = strand3p.oligo()
             self._updateOligo = updateOligo
+            self._absorbToken = None
         # end def
 
         def redo(self):
@@ -1253,13 +2143,13 @@ class Part(QObject):
                     olg5p.incrementLength(oldOlg3p.length())
                     # 2. Remove the old oligo and apply the 5' oligo to the 3' strand
                     oldOlg3p.removeFromPart()
-                    for strand in strand3p.generator3pStrand():
-                        # emits strandHasNewOligoSignal
-                        Strand.setOligo(strand, olg5p)
+                    self._absorbToken = olg5p._absorb(oldOlg3p)
+                    oldOlg3p.oligoIdentityChangedSignal.emit(olg5p)
 
             # 3. install the Xover
             strand5p.setConnection3p(strand3p)
             strand3p.setConnection5p(strand5p)
+            part._invalidateXoverStrands((strand5p, strand3p))
 
             ss5 = strand5p.strandSet()
             vh5p = ss5.virtualHelix()
@@ -1292,6 +2182,7 @@ class Part(QObject):
             # 1. uninstall the Xover
             strand5p.setConnection3p(None)
             strand3p.setConnection5p(None)
+            part._invalidateXoverStrands((strand5p, strand3p))
 
             if self._updateOligo:
                 # Test Loopiness
@@ -1302,9 +2193,9 @@ class Part(QObject):
                     olg5p.decrementLength(oldOlg3p.length())
                     # 3. apply the old oligo to strand3p
                     oldOlg3p.addToPart(part)
-                    for strand in strand3p.generator3pStrand():
-                        # emits strandHasNewOligoSignal
-                        Strand.setOligo(strand, oldOlg3p)
+                    olg5p._unabsorb(self._absorbToken)
+                    self._absorbToken = None
+                    olg5p.oligoIdentityChangedSignal.emit(oldOlg3p)
 
             ss5 = strand5p.strandSet()
             vh5p = ss5.virtualHelix()
@@ -1323,7 +2214,8 @@ class Part(QObject):
 
     class RefreshOligosCommand(QUndoCommand):
         """
-        RefreshOligosCommand is a post-processing step for AutoStaple.
+        RefreshOligosCommand is a post-processing step for AutoStaple and
+        Part.batchEdit.
 
         Normally when an xover is created, all strands in the 3' direction are
         assigned the oligo of the 5' strand. This becomes very expensive
@@ -1331,61 +2223,72 @@ class Part(QObject):
         strands.
 
         Hence, we disable oligo assignment during the xover creation step,
-        and then do it all in one pass at the end with this command.
+        and then do it all in one pass at the end with this command. Each
+        strand chain that contains one of strands (every staple strand by
+        default) is walked once; the oligo of its 5' strand absorbs the
+        others and takes on the chain's 5' end, loop flag and length.
         """
-        def __init__(self, part):
+        def __init__(self, part, strands=None):
             super(Part.RefreshOligosCommand, self).__init__()
             self._part = part
+            self._strands = strands
+            self._absorbed = []  # (kept oligo, absorbed oligo, token)
+            self._oldStates = []  # (oligo, strand5p, isLoop, length)
+            self._updated = []
         # end def
 
         def redo(self):
-            visited = {}
-            for vh in self._part.getVirtualHelices():
-                stapSS = vh.stapleStrandSet()
-                for strand in stapSS:
-                    visited[strand] = False
-
-            for strand in list(visited.keys()):
-                if visited[strand]:
+            part = self._part
+            strands = self._strands
+            if strands is None:
+                strands = [strand for vh in part.getVirtualHelices() \
+                                        for strand in vh.stapleStrandSet()]
+            else:  # skip strands that left the model later in the batch
+                strands = [strand for strand in strands \
+                                            if strand in part._ownerSlots]
+            absorbed = self._absorbed = []
+            oldStates = self._oldStates = []
+            updated = self._updated = []
+            visited = set()
+            for strand in strands:
+                if strand in visited:
                     continue
-                visited[strand] = True
-                startOligo = strand.oligo()
-                strand5gen = strand.generator5pStrand()
-                # this gets the oligo and burns a strand in the generator
-                strand5 = strand5gen.next()
-                for strand5 in strand5gen:
-                    oligo5 = strand5.oligo()
-                    if oligo5 != startOligo:
-                        oligo5.removeFromPart()
-                        Strand.setOligo(strand5, startOligo)  # emits strandHasNewOligoSignal
-                    visited[strand5] = True
+                for strand5 in strand.generator5pStrand():
+                    pass
+                # the walk only stops short of a 5' end on a loop
+                isLoop = strand5.connection5p() is not None
+                keep = strand5.oligo()
+                oldStates.append((keep, keep.strand5p(), keep.isLoop(), \
+                                                            keep.length()))
+                for strand3 in strand5.generator3pStrand():
+                    visited.add(strand3)
+                    updated.append(strand3)
+                    olg = strand3.oligo()
+                    if olg is not keep:
+                        olg.removeFromPart()
+                        absorbed.append((keep, olg, keep._absorb(olg)))
+                        olg.oligoIdentityChangedSignal.emit(keep)
                 # end for
-                startOligo.setStrand5p(strand5)
-                # is it a loop?
-                if strand.connection3p() == strand5:
-                    startOligo.setLoop(True)
-                else:
-                    strand3gen = strand.generator3pStrand()
-                    strand3 = strand3gen.next()   # burn one
-                    for strand3 in strand3gen:
-                        oligo3 = strand3.oligo()
-                        if oligo3 != startOligo:
-                            oligo3.removeFromPart()
-                            Strand.setOligo(strand3, startOligo)  # emits strandHasNewOligoSignal
-                        visited[strand3] = True
-                    # end for
-                startOligo.refreshLength()
+                keep.setStrand5p(strand5)
+                keep.setLoop(isLoop)
+                keep.refreshLength()
             # end for
-
-            oligoSet = set()
-            for strand in visited.keys():
-                oligoSet.add(strand.oligo())
+            for strand in updated:
                 strand.strandUpdateSignal.emit(strand)
         # end def
 
         def undo(self):
-            """Doesn't reassign """
-            pass
+            part = self._part
+            for keep, olg, token in reversed(self._absorbed):
+                keep._unabsorb(token)
+                olg.addToPart(part)
+                keep.oligoIdentityChangedSignal.emit(olg)
+            for olg, strand5p, isLoop, length in reversed(self._oldStates):
+                olg.setStrand5p(strand5p)
+                olg.setLoop(isLoop)
+                olg.setLength(length)
+            for strand in self._updated:
+                strand.strandUpdateSignal.emit(strand)
         # end def
     # end class
 
@@ -1416,6 +2319,7 @@ class Part(QObject):
             nO3p.setStrand5p(strand3p)
             
             self._isLoop = strand3p.oligo().isLoop()
+            self._relabelled = []  # (strand, oligo label before redo)
         # end def
 
         def redo(self):
@@ -1435,6 +2339,7 @@ class Part(QObject):
             # 1. uninstall the Xover
             strand5p.setConnection3p(None)
             strand3p.setConnection5p(None)
+            part._invalidateXoverStrands((strand5p, strand3p))
 
             if self._isLoop:
                 olg5p.setLoop(False)
@@ -1442,11 +2347,11 @@ class Part(QObject):
             else:
                 # 2. restore the modified oligo length
                 olg5p.decrementLength(newOlg3p.length())
-                # 3. apply the old oligo to strand3p
+                # 3. apply the new oligo to strand3p
                 newOlg3p.addToPart(part)
-                for strand in strand3p.generator3pStrand():
-                    # emits strandHasNewOligoSignal
-                    Strand.setOligo(strand, newOlg3p)
+                newOlg3p._relabel(strand3p.generator3pStrand(), \
+                                  self._relabelled, emitSignal=False)
+                olg5p.oligoIdentityChangedSignal.emit(newOlg3p)
 
             ss5 = strand5p.strandSet()
             vh5p = ss5.virtualHelix()
@@ -1481,16 +2386,17 @@ class Part(QObject):
             else:
                 # 1. update preserved oligo length
                 olg5p.incrementLength(newOlg3p.length())
-                # 2. Remove the old oligo and apply the 5' oligo to the 3' strand
+                # 2. Remove the new oligo and give the 3' strands back their
+                # exact labels (see Oligo), undoing earlier merges relies on it
                 newOlg3p.removeFromPart()
-                for strand in strand3p.generator3pStrand():
-                    # emits strandHasNewOligoSignal
-                    Strand.setOligo(strand, olg5p)
+                Oligo._restoreLabels(self._relabelled, emitSignal=False)
+                newOlg3p.oligoIdentityChangedSignal.emit(olg5p)
             # end else
 
             # 3. install the Xover
             strand5p.setConnection3p(strand3p)
             strand3p.setConnection5p(strand5p)
+            part._invalidateXoverStrands((strand5p, strand3p))
 
             ss5 = strand5p.strandSet()
             vh5p = ss5.virtualHelix()
@@ -1561,7 +2467,7 @@ class Part(QObject):
                 for strand in sList:
                     sSet.removeStrand(strand)
                 # end for
-                sSet._strandList = []
+                sSet._resetStrandList([])
             #end for
             for vh in self._vhs:
                 # for updating the Slice View displayed helices
@@ -1579,7 +2485,7 @@ class Part(QObject):
                 for strand in sList:
                     sSet.strandsetStrandAddedSignal.emit(sSet, strand)
                 # end for
-                sSet._strandList = sList
+                sSet._resetStrandList(sList)
             #end for
             for vh in self._vhs:
                 # for updating the Slice View displayed helices
@@ -1594,8 +2500,17 @@ class Part(QObject):
         """
         set the maximum and mininum base index in the helical direction
 
-        need to adjust all subelements in the event of a change in the
-        minimum index
+        minHelixDelta is the number of bases added at the low end, not a
+        change of minBaseIdx(): the part still starts at minBaseIdx() (the
+        _minBase field no longer moves), every existing base moves up by
+        minHelixDelta, and maxBaseIdx() grows by minHelixDelta +
+        maxHelixDelta. Keep minHelixDelta a multiple of the step size so
+        the crossover pattern stays in register. Strands and insertions
+        store their indices relative to the part's base offset, and the
+        owner map keeps headroom at both ends of its rows, so no strand is
+        visited. Resizing within the headroom, and undoing a
+        resize, is constant time; growing past it copies the owner map
+        once (see Part._resizeBaseOwners).
         """
         def __init__(self, part, minHelixDelta, maxHelixDelta):
             super(Part.ResizePartCommand, self).__init__()
@@ -1607,47 +2522,29 @@ class Part(QObject):
 
         def redo(self):
             part = self._part
-            part._minBase += self._minDelta
-            part._maxBase += self._maxDelta
-            if self._minDelta != 0:
-                self.deltaMinDimension(part, self._minDelta)
+            part._resizeBaseOwners(self._minDelta, self._maxDelta)
+            part._baseOffset += self._minDelta
+            part._maxBase += self._minDelta + self._maxDelta
             for vh in part._coordToVirtualHelix.itervalues():
                 part.partVirtualHelixResizedSignal.emit(part, vh.coord())
-            if self._oldActiveIdx > part._maxBase:
-                part.setActiveBaseIndex(part._maxBase)
+            # the active base moves up with the bases added below it
+            activeIdx = min(max(self._oldActiveIdx + self._minDelta, 0), \
+                                                            part._maxBase)
+            if activeIdx != part.activeBaseIndex():
+                part.setActiveBaseIndex(activeIdx)
             part.partDimensionsChangedSignal.emit(part)
         # end def
 
         def undo(self):
             part = self._part
-            part._minBase -= self._minDelta
-            part._maxBase -= self._maxDelta
-            if self._minDelta != 0:
-                self.deltaMinDimension(part, self._minDelta)
+            part._resizeBaseOwners(-self._minDelta, -self._maxDelta)
+            part._baseOffset -= self._minDelta
+            part._maxBase -= self._minDelta + self._maxDelta
             for vh in part._coordToVirtualHelix.itervalues():
                 part.partVirtualHelixResizedSignal.emit(part, vh.coord())
             if self._oldActiveIdx != part.activeBaseIndex():
                 part.setActiveBaseIndex(self._oldActiveIdx)
             part.partDimensionsChangedSignal.emit(part)
         # end def
-
-        def deltaMinDimension(self, part, minDimensionDelta):
-            """
-            Need to update:
-            strands
-            insertions
-            """
-            for vhDict in part._insertions.itervalues():
-                for insertion in vhDict:
-                    insertion.updateIdx(minDimensionDelta)
-                # end for
-            # end for
-            for vh in part._coordToVirtualHelix.itervalues():
-                for strand in vh.scaffoldStrand().generatorStrand():
-                    strand.updateIdxs(minDimensionDelta)
-                for strand in vh.stapleStrand().generatorStrand():
-                    strand.updateIdxs(minDimensionDelta)
-            # end for
-        # end def
     # end class
 # end class
@@ -22,6 +22,12 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
+from array import array
+from math import floor
+try:
+    import numpy
+except ImportError:  # positions are then computed in pure Python
+    numpy = None
 from cadnano import app
 from model.enum import LatticeType
 from part import Part
@@ -65,35 +71,26 @@ class SquarePart(Part):
         return (row % 2) ^ (column % 2)
     # end def
 
-    def getVirtualHelixNeighbors(self, virtualHelix):
+    def _neighborCoords(self, row, column):
         """
-        returns the list of neighboring virtualHelices based on parity of an
-        input virtualHelix
-
-        If a potential neighbor doesn't exist, None is returned in it's place
+        returns the coords of the neighbors of (row, column) based on its
+        parity; the order is important, it defines the directions p0, p1...
         """
-        neighbors = []
-        vh = virtualHelix
-        if vh == None:
-            return neighbors
-
-        # assign the method to a a local variable
-        getVH = self.virtualHelixAtCoord
-        # get the vh's row and column r,c
-        (r,c) = vh.coord()
-
+        r, c = row, column
         if self.isEvenParity(r, c):
-            neighbors.append(getVH((r,c+1)))  # p0 neighbor (p0 is a direction)
-            neighbors.append(getVH((r+1,c)))  # p1 neighbor
-            neighbors.append(getVH((r,c-1)))  # p2 neighbor
-            neighbors.append(getVH((r-1,c)))  # p2 neighbor
+            return (
+                    (r,c+1),  # p0 neighbor (p0 is a direction)
+                    (r+1,c),  # p1 neighbor
+                    (r,c-1),  # p2 neighbor
+                    (r-1,c),  # p2 neighbor
+                    )
         else:
-            neighbors.append(getVH((r,c-1)))  # p0 neighbor (p0 is a direction)
-            neighbors.append(getVH((r-1,c)))  # p1 neighbor
-            neighbors.append(getVH((r,c+1)))  # p2 neighbor
-            neighbors.append(getVH((r+1,c)))  # p3 neighbor
-        # For indices of available directions, use range(0, len(neighbors))
-        return neighbors  # Note: the order and presence of Nones is important
+            return (
+                    (r,c-1),  # p0 neighbor (p0 is a direction)
+                    (r-1,c),  # p1 neighbor
+                    (r,c+1),  # p2 neighbor
+                    (r+1,c),  # p3 neighbor
+                    )
     # end def
 
     def latticeCoordToPositionXY(self, row, column, scaleFactor=1.0):
@@ -107,12 +104,32 @@ class SquarePart(Part):
     # end def
 
     def positionToCoord(self, x, y, scaleFactor=1.0):
-        """
-        """
-        radius = self._radius
-        row = int(y/(2*radius*scaleFactor) + 0.5)
-        column = int(x/(2*radius*scaleFactor) + 0.5)
-        return row, column
+        rows, columns = self.positionsToCoords((x,), (y,), scaleFactor)
+        return rows[0], columns[0]
+    # end def
+
+    def latticePositionsXY(self, rows, columns, scaleFactor=1.0):
+        diameter = 2*self._radius*scaleFactor
+        if numpy is not None:
+            xs = numpy.asarray(columns, dtype=numpy.intp)*diameter
+            ys = numpy.asarray(rows, dtype=numpy.intp)*diameter
+            return array('d', xs.astype('d').tostring()), \
+                   array('d', ys.astype('d').tostring())
+        xs = array('d', [column*diameter for column in columns])
+        ys = array('d', [row*diameter for row in rows])
+        return xs, ys
+    # end def
+
+    def positionsToCoords(self, xs, ys, scaleFactor=1.0):
+        diameter = 2*self._radius*scaleFactor
+        if numpy is not None:
+            rows = numpy.floor(numpy.asarray(ys, dtype='d')/diameter + 0.5)
+            columns = numpy.floor(numpy.asarray(xs, dtype='d')/diameter + 0.5)
+            return array('i', rows.astype(numpy.intc).tostring()), \
+                   array('i', columns.astype(numpy.intc).tostring())
+        rows = array('i', [int(floor(y/diameter + 0.5)) for y in ys])
+        columns = array('i', [int(floor(x/diameter + 0.5)) for x in xs])
+        return rows, columns
     # end def
 
     def fillSimpleRep(self, sr):
@@ -28,7 +28,6 @@
 from exceptions import IndexError
 from operator import attrgetter
 import util
-from array import array
 from decorators.insertion import Insertion
 
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
@@ -36,7 +35,87 @@ util.qtWrapImport('QtCore', globals(), ['pyqtSignal', 'QObject'])
 util.qtWrapImport('QtGui', globals(), ['QUndoStack', 'QUndoCommand'])
 
 
-class Strand(QObject):
+class StrandSignals(QObject):
+    """
+    The signals of one Strand. Strands are plain records, so a strand only
+    gets a StrandSignals once something connects to one of its signals;
+    see Strand._signalProxy.
+    """
+    strandHasNewOligoSignal = pyqtSignal(object)  # strand
+    strandRemovedSignal = pyqtSignal(object)  # strand
+    strandResizedSignal = pyqtSignal(object, tuple)
+
+    # Parameters: (strand3p, strand5p)
+    strandXover5pChangedSignal = pyqtSignal(object, object)
+    strandXover5pRemovedSignal = pyqtSignal(object, object)
+
+    # Parameters: (strand)
+    strandUpdateSignal = pyqtSignal(object)
+
+    # Parameters: (strand, insertion object)
+    strandInsertionAddedSignal = pyqtSignal(object, object)
+    strandInsertionChangedSignal = pyqtSignal(object, object)
+    # Parameters: (strand, insertion index)
+    strandInsertionRemovedSignal = pyqtSignal(object, int)
+
+    # Parameters: (strand, decorator object)
+    strandDecoratorAddedSignal = pyqtSignal(object, object)
+    strandDecoratorChangedSignal = pyqtSignal(object, object)
+    # Parameters: (strand, decorator index)
+    strandDecoratorRemovedSignal = pyqtSignal(object, int)
+
+    # Parameters: (strand, modifier object)
+    strandModifierAddedSignal = pyqtSignal(object, object)
+    strandModifierChangedSignal = pyqtSignal(object, object)
+    # Parameters: (strand, modifier index)
+    strandModifierRemovedSignal = pyqtSignal(object, int)
+
+    # Parameters: (strand, value)
+    selectedChangedSignal = pyqtSignal(object, tuple)
+# end class
+
+
+class _UnconnectedSignal(object):
+    """
+    Stands in for a signal of a strand that has no StrandSignals yet:
+    emitting does nothing, since nothing can be connected, and connecting
+    creates the strand's StrandSignals.
+    """
+    __slots__ = ('_strand', '_name')
+
+    def __init__(self, strand, name):
+        self._strand = strand
+        self._name = name
+
+    def emit(self, *args):
+        pass
+
+    def connect(self, *args):
+        getattr(self._strand._signalProxy(), self._name).connect(*args)
+
+    def disconnect(self, *args):
+        getattr(self._strand._signalProxy(), self._name).disconnect(*args)
+# end class
+
+
+class _StrandSignal(object):
+    """Strand attribute for the StrandSignals signal of the same name."""
+    __slots__ = ('_name',)
+
+    def __init__(self, name):
+        self._name = name
+
+    def __get__(self, strand, cls):
+        if strand is None:
+            return self
+        signals = strand._signals
+        if signals is None:
+            return _UnconnectedSignal(strand, self._name)
+        return getattr(signals, self._name)
+# end class
+
+
+class Strand(object):
     """
     A Strand is a continuous stretch of bases that are all in the same
     StrandSet (recall: a VirtualHelix is made up of two StrandSets).
@@ -46,57 +125,64 @@ class Strand(QObject):
     endpoints (low and high). Thus, Strand has a '_baseIdxLow', which is its
     index with the lower numeric value (typically positioned on the left),
     and a '_baseIdxHigh' which is the higher-value index (typically positioned
-    on the right)
+    on the right). Both are stored relative to the part's base offset (see
+    Part.baseOffset), so the accessors add it back.
 
     Strands can be linked to other strands by "connections". References to
     connected strands are named "_strand5p" and "_strand3p", which correspond
     to the 5' and 3' phosphate linkages in the physical DNA strand,
     respectively. Since Strands can point 5'-to-3' in either the low-to-high
     or high-to-low directions, connection accessor methods (connectionLow and
-    connectionHigh) are bound during the init for convenience.
+    connectionHigh) map low/high onto 5'/3' using the drawing direction
+    cached at init.
+
+    Strands are created in large numbers (every split, merge and import
+    makes new ones), so a Strand is a plain record with __slots__ rather
+    than a QObject. Its signals live on a StrandSignals that is only
+    created when a view connects to one of them; until then emitting is a
+    no-op. Decorator and modifier dicts are likewise only allocated once
+    something is stored in them.
+
+    totalLength() is cached on the strand; the commands that change a
+    strand's bounds or the insertions under it must call
+    _invalidateTotalLength(), which also drops the oligo's cached strand
+    table (see Oligo). Set CADNANO_CHECK_STRAND_LENGTHS=1 in the
+    environment to cross-check every cached value against a recomputation.
     """
+    __slots__ = ('_strandSet', '_baseIdxLow', '_baseIdxHigh', '_oligo',
+                 '_strand5p', '_strand3p', '_lowNeighbor', '_highNeighbor',
+                 '_sequence', '_totalLength', '_decorators', '_modifiers',
+                 '_isDrawn5to3', '_signals')
+    checkTotalLength = util.envFlag('CADNANO_CHECK_STRAND_LENGTHS')
 
     def __init__(self, strandSet, baseIdxLow, baseIdxHigh, oligo=None):
-        super(Strand, self).__init__(strandSet)
         self._strandSet = strandSet
-        self._doc = strandSet.document()
 
-        self._baseIdxLow = baseIdxLow  # base index of the strand's left bound
-        self._baseIdxHigh = baseIdxHigh  # base index of the right bound
+        offset = strandSet._part._baseOffset
+        self._baseIdxLow = baseIdxLow - offset  # stored left bound
+        self._baseIdxHigh = baseIdxHigh - offset  # stored right bound
         self._oligo = oligo
         self._strand5p = None  # 5' connection to another strand
         self._strand3p = None  # 3' connection to another strand
+        self._lowNeighbor = None  # adjacent strands in the StrandSet,
+        self._highNeighbor = None  # maintained by the StrandSet
         self._sequence = None
+        self._totalLength = None  # cached by totalLength()
 
-        self._decorators = {}
-        self._modifiers = {}
-
-        # dynamic methods for mapping high/low connection /indices
-        # to corresponding 3Prime 5Prime
-        isDrawn5to3 = strandSet.isDrawn5to3()
-        if isDrawn5to3:
-            self.idx5Prime = self.lowIdx
-            self.idx3Prime = self.highIdx
-            self.connectionLow = self.connection5p
-            self.connectionHigh = self.connection3p
-            self.setConnectionLow = self.setConnection5p
-            self.setConnectionHigh = self.setConnection3p
-        else:
-            self.idx5Prime = self.highIdx
-            self.idx3Prime = self.lowIdx
-            self.connectionLow = self.connection3p
-            self.connectionHigh = self.connection5p
-            self.setConnectionLow = self.setConnection3p
-            self.setConnectionHigh = self.setConnection5p
-        self._isDrawn5to3 = isDrawn5to3
+        self._decorators = None  # allocated on first use
+        self._modifiers = None  # allocated on first use
+
+        self._isDrawn5to3 = strandSet.isDrawn5to3()
+        self._signals = None  # StrandSignals, created on first connect
     # end def
 
     def __repr__(self):
         clsName = self.__class__.__name__
+        lowIdx, highIdx = self.idxs()
         s = "%s.<%s(%s, %s)>" % (self._strandSet.__repr__(),
                                 clsName,
-                                self._baseIdxLow,
-                                self._baseIdxHigh)
+                                lowIdx,
+                                highIdx)
         return s
 
     def generator5pStrand(self):
@@ -141,45 +227,38 @@ class Strand(QObject):
         return self._strandSet.strandFilter()
 
     ### SIGNALS ###
-    strandHasNewOligoSignal = pyqtSignal(QObject)  # strand
-    strandRemovedSignal = pyqtSignal(QObject)  # strand
-    strandResizedSignal = pyqtSignal(QObject, tuple)
-
-    # Parameters: (strand3p, strand5p)
-    strandXover5pChangedSignal = pyqtSignal(QObject, QObject)
-    strandXover5pRemovedSignal = pyqtSignal(QObject, QObject)
-
-    # Parameters: (strand)
-    strandUpdateSignal = pyqtSignal(QObject)
-
-    # Parameters: (strand, insertion object)
-    strandInsertionAddedSignal = pyqtSignal(QObject, object)
-    strandInsertionChangedSignal = pyqtSignal(QObject, object)
-    # Parameters: (strand, insertion index)
-    strandInsertionRemovedSignal = pyqtSignal(QObject, int)
-
-    # Parameters: (strand, decorator object)
-    strandDecoratorAddedSignal = pyqtSignal(QObject, object)
-    strandDecoratorChangedSignal = pyqtSignal(QObject, object)
-    # Parameters: (strand, decorator index)
-    strandDecoratorRemovedSignal = pyqtSignal(QObject, int)
-
-    # Parameters: (strand, modifier object)
-    strandModifierAddedSignal = pyqtSignal(QObject, object)
-    strandModifierChangedSignal = pyqtSignal(QObject, object)
-    # Parameters: (strand, modifier index)
-    strandModifierRemovedSignal = pyqtSignal(QObject, int)
-
-    # Parameters: (strand, value)
-    selectedChangedSignal = pyqtSignal(QObject, tuple)
+    # see StrandSignals for the parameters
+    strandHasNewOligoSignal = _StrandSignal('strandHasNewOligoSignal')
+    strandRemovedSignal = _StrandSignal('strandRemovedSignal')
+    strandResizedSignal = _StrandSignal('strandResizedSignal')
+    strandXover5pChangedSignal = _StrandSignal('strandXover5pChangedSignal')
+    strandXover5pRemovedSignal = _StrandSignal('strandXover5pRemovedSignal')
+    strandUpdateSignal = _StrandSignal('strandUpdateSignal')
+    strandInsertionAddedSignal = _StrandSignal('strandInsertionAddedSignal')
+    strandInsertionChangedSignal = _StrandSignal('strandInsertionChangedSignal')
+    strandInsertionRemovedSignal = _StrandSignal('strandInsertionRemovedSignal')
+    strandDecoratorAddedSignal = _StrandSignal('strandDecoratorAddedSignal')
+    strandDecoratorChangedSignal = _StrandSignal('strandDecoratorChangedSignal')
+    strandDecoratorRemovedSignal = _StrandSignal('strandDecoratorRemovedSignal')
+    strandModifierAddedSignal = _StrandSignal('strandModifierAddedSignal')
+    strandModifierChangedSignal = _StrandSignal('strandModifierChangedSignal')
+    strandModifierRemovedSignal = _StrandSignal('strandModifierRemovedSignal')
+    selectedChangedSignal = _StrandSignal('selectedChangedSignal')
 
     ### SLOTS ###
     ### ACCESSORS ###
+    def _signalProxy(self):
+        """Returns the StrandSignals of the strand, creating it if needed."""
+        if self._signals is None:
+            self._signals = StrandSignals()
+        return self._signals
+    # end def
+
     def undoStack(self):
         return self._strandSet.undoStack()
 
     def decorators(self):
-        return self._decorators
+        return self._decorators if self._decorators is not None else {}
     # end def
 
     def isStaple(self):
@@ -193,11 +272,17 @@ class Strand(QObject):
     # end def
 
     def document(self):
-        return self._doc
+        return self._strandSet.document()
     # end def
 
     def oligo(self):
-        return self._oligo
+        """Resolves the oligo label of the strand (see Oligo)."""
+        node = self._oligo
+        if node is None:
+            return None
+        while node._ufParent is not None:
+            node = node._ufParent
+        return node._ufIdentity
     # end def
 
     def sequence(self, forExport=False):
@@ -205,7 +290,7 @@ class Strand(QObject):
         if seq:
             return util.markwhite(seq) if forExport else seq
         elif forExport:
-            return ''.join(['?' for x in range(self.totalLength())])
+            return '?' * self.totalLength()
         return ''
     # end def
 
@@ -230,8 +315,7 @@ class Strand(QObject):
             return None, None
         length = self.totalLength()
         if len(sequenceString) < length:
-            bonus = length - len(sequenceString)
-            sequenceString += ''.join([' ' for x in range(bonus)])
+            sequenceString = sequenceString.ljust(length)
         temp = sequenceString[0:length]
         self._sequence = temp
         return temp, sequenceString[length:]
@@ -271,7 +355,8 @@ class Strand(QObject):
 
         Will refine later by checking for lattice neighbors in 3D.
         """
-        return range(self._baseIdxLow, self._baseIdxHigh + 1)
+        lo, hi = self.idxs()
+        return range(lo, hi + 1)
     # end def
 
     # def getPreDecoratorIdxList(self):
@@ -308,7 +393,7 @@ class Strand(QObject):
         Perhaps it's wiser to merely store them left to right and reverse them
         at draw time, or export time
         """
-        sLowIdx, sHighIdx = self._baseIdxLow, self._baseIdxHigh
+        sLowIdx, sHighIdx = self.idxs()
         cLowIdx, cHighIdx = strand.idxs()
 
         # get the ovelap
@@ -321,18 +406,19 @@ class Strand(QObject):
 
         # see if we are applying
         if sequenceString == None:
-            # clear out string for in case of not total overlap
-            useSeq = ''.join([' ' for x in range(totalLength)])
+            # clear out string for in case of not total overlap; it is
+            # indexed like strand's sequence, so it needs strand's length
+            useSeq = ' ' * strand.totalLength()
         else:  # use the string as is
             useSeq = sequenceString[::-1] if self._isDrawn5to3 \
                                             else sequenceString
 
-        temp = array('c', useSeq)
+        # work on the sequence left to right
         if self._sequence == None:
-            tempSelf = array('c', ''.join([' ' for x in range(totalLength)]))
+            tempSelf = ' ' * totalLength
         else:
-            tempSelf = array('c', self._sequence if self._isDrawn5to3 \
-                                                    else self._sequence[::-1])
+            tempSelf = self._sequence if self._isDrawn5to3 \
+                                                else self._sequence[::-1]
 
         # generate the index into the compliment string
         a = self.insertionLengthBetweenIdxs(sLowIdx, lowIdx - 1)
@@ -340,19 +426,19 @@ class Strand(QObject):
         c = strand.insertionLengthBetweenIdxs(cLowIdx, lowIdx - 1)
         start = lowIdx - cLowIdx + c
         end = start + b + highIdx - lowIdx + 1
-        tempSelf[lowIdx - sLowIdx + a:highIdx - sLowIdx + 1 + a + b] = \
-                                                                temp[start:end]
+        i0 = lowIdx - sLowIdx + a
+        i1 = highIdx - sLowIdx + 1 + a + b
+        # splice the overlap in with a single concatenation
+        tempSelf = tempSelf[:i0] + useSeq[start:end] + tempSelf[i1:]
         # print "old sequence", self._sequence
-        self._sequence = tempSelf.tostring()
-        
+
         # if we need to reverse it do it now
-        if not self._isDrawn5to3:
-            self._sequence = self._sequence[::-1]
+        self._sequence = tempSelf if self._isDrawn5to3 else tempSelf[::-1]
 
-        # test to see if the string is empty(), annoyingly expensive
-        if len(self._sequence.strip()) == 0:
+        # test to see if the string is empty
+        if not tempSelf.strip():
             self._sequence = None
-            
+
         # print "new sequence", self._sequence
         return self._sequence
     # end def
@@ -366,25 +452,34 @@ class Strand(QObject):
         return self._strand5p
     # end def
 
+    def connectionLow(self):
+        return self._strand5p if self._isDrawn5to3 else self._strand3p
+    # end def
+
+    def connectionHigh(self):
+        return self._strand3p if self._isDrawn5to3 else self._strand5p
+    # end def
+
     def idxs(self):
-        return (self._baseIdxLow, self._baseIdxHigh)
+        offset = self._strandSet._part._baseOffset
+        return (self._baseIdxLow + offset, self._baseIdxHigh + offset)
     # end def
 
     def lowIdx(self):
-        return self._baseIdxLow
+        return self._baseIdxLow + self._strandSet._part._baseOffset
     # end def
 
     def highIdx(self):
-        return self._baseIdxHigh
+        return self._baseIdxHigh + self._strandSet._part._baseOffset
     # end def
 
     def idx3Prime(self):
         """Returns the absolute baseIdx of the 3' end of the strand."""
-        return self.idx3Prime
+        return self.highIdx() if self._isDrawn5to3 else self.lowIdx()
 
     def idx5Prime(self):
         """Returns the absolute baseIdx of the 5' end of the strand."""
-        return self.idx5Prime
+        return self.lowIdx() if self._isDrawn5to3 else self.highIdx()
 
     def isDrawn5to3(self):
         return self._strandSet.isDrawn5to3()
@@ -472,18 +567,19 @@ class Strand(QObject):
         When a neighbor is not present, just use the Part boundary.
         """
         neighbors = self._strandSet.getNeighbors(self)
-        if idx == self._baseIdxLow:
+        lowIdx, highIdx = self.idxs()
+        if idx == lowIdx:
             if neighbors[0]:
                 low = neighbors[0].highIdx() + 1
             else:
                 low = self.part().minBaseIdx()
-            return low, self._baseIdxHigh - 1
-        else:  # self._baseIdxHigh
+            return low, highIdx - 1
+        else:  # highIdx
             if neighbors[1]:
                 high = neighbors[1].lowIdx() - 1
             else:
                 high = self.part().maxBaseIdx()
-            return self._baseIdxLow + 1, high
+            return lowIdx + 1, high
     # end def
 
     def hasXoverAt(self, idx):
@@ -537,30 +633,18 @@ class Strand(QObject):
         """
         includes the length of insertions in addition to the bases
         """
-        tL = 0
-        insertions = self.insertionsOnStrand(idxL, idxH)
-        for insertion in insertions:
-            tL += insertion.length()
-        return tL
+        coord = self.virtualHelix().coord()
+        return self.part().insertionLengthBetweenIdxs(coord, idxL, idxH)
     # end def
 
     def insertionsOnStrand(self, idxL=None, idxH=None):
         """
         if passed indices it will use those as a bounds
         """
-        insertions = []
         coord = self.virtualHelix().coord()
-        insertionsDict = self.part().insertions()[coord]
-        sortedIndices = sorted(insertionsDict.keys())
         if idxL == None:
             idxL, idxH = self.idxs()
-        for index in sortedIndices:
-            insertion = insertionsDict[index]
-            if idxL <= insertion.idx() <= idxH:
-                insertions.append(insertion)
-            # end if
-        # end for
-        return insertions
+        return self.part().insertionsBetweenIdxs(coord, idxL, idxH)
     # end def
 
     def length(self):
@@ -571,18 +655,52 @@ class Strand(QObject):
         """
         includes the length of insertions in addition to the bases
         """
-        tL = 0
-        insertions = self.insertionsOnStrand()
+        tL = self._totalLength
+        if tL is None:
+            tL = self._totalLength = self._computeTotalLength()
+        elif self.checkTotalLength:
+            computed = self._computeTotalLength()
+            if computed != tL:
+                raise AssertionError("%s cached totalLength %d != %d" % \
+                                                    (self, tL, computed))
+        return tL
+    # end def
 
-        for insertion in insertions:
-            tL += insertion.length()
-        return tL + self.length()
+    def _computeTotalLength(self):
+        return self.insertionLengthBetweenIdxs(*self.idxs()) + self.length()
+    # end def
+
+    def _invalidateTotalLength(self):
+        self._totalLength = None
+        self._invalidateOligoStrands()
+    # end def
+
+    def _topologyKey(self):
+        """
+        Identifies the strand's place in the design for Oligo.fingerprint.
+        Indices are the stored ones, so resizing the part leaves it be.
+        """
+        insertions = tuple([(insertion._index, insertion.length()) for \
+                                        insertion in self.insertionsOnStrand()])
+        return (self._strandSet.virtualHelix().coord(),
+                self._strandSet.strandType(),
+                self._baseIdxLow, self._baseIdxHigh, insertions)
+    # end def
+
+    def _invalidateOligoStrands(self):
+        """Drops the cached strand table of the oligo self belongs to."""
+        olg = self.oligo()
+        if olg is not None:
+            olg._invalidateStrandCache()
     # end def
 
     ### PUBLIC METHODS FOR EDITING THE MODEL ###
     def addDecorators(self, additionalDecorators):
         """Used to add decorators during a merge operation."""
-        self._decorators.update(additionalDecorators)
+        if additionalDecorators:
+            if self._decorators is None:
+                self._decorators = {}
+            self._decorators.update(additionalDecorators)
     # end def
 
     def addInsertion(self, idx, length, useUndoStack=True):
@@ -650,19 +768,21 @@ class Strand(QObject):
     # end def
 
     def destroy(self):
-        self.setParent(None)
-        self.deleteLater()  # QObject also emits a destroyed() Signal
+        if self._signals is not None:
+            self._signals.deleteLater()  # emits the proxy's destroyed()
+            self._signals = None
     # end def
 
     def merge(self, idx):
         """Check for neighbor, then merge if possible."""
         lowNeighbor, highNeighbor = self._strandSet.getNeighbors(self)
+        lowIdx, highIdx = self.idxs()
         # determine where to check for neighboring endpoint
-        if idx == self._baseIdxLow:
+        if idx == lowIdx:
             if lowNeighbor:
                 if lowNeighbor.highIdx() == idx - 1:
                     self._strandSet.mergeStrands(self, lowNeighbor)
-        elif idx == self._baseIdxHigh:
+        elif idx == highIdx:
             if highNeighbor:
                 if highNeighbor.lowIdx() == idx + 1:
                     self._strandSet.mergeStrands(self, highNeighbor)
@@ -682,20 +802,50 @@ class Strand(QObject):
     # end def
 
     def setConnection3p(self, strand):
+        old = self._strand3p
         self._strand3p = strand
+        self._invalidateOligoStrands()
+        if old is not None:
+            old._invalidateOligoStrands()
+        if strand is not None:
+            strand._invalidateOligoStrands()
     # end def
 
     def setConnection5p(self, strand):
+        old = self._strand5p
         self._strand5p = strand
+        self._invalidateOligoStrands()
+        if old is not None:
+            old._invalidateOligoStrands()
+        if strand is not None:
+            strand._invalidateOligoStrands()
+    # end def
+
+    def setConnectionLow(self, strand):
+        if self._isDrawn5to3:
+            self.setConnection5p(strand)
+        else:
+            self.setConnection3p(strand)
+    # end def
+
+    def setConnectionHigh(self, strand):
+        if self._isDrawn5to3:
+            self.setConnection3p(strand)
+        else:
+            self.setConnection5p(strand)
     # end def
 
     def setIdxs(self, idxs):
-        self._baseIdxLow = idxs[0]
-        self._baseIdxHigh = idxs[1]
+        self._strandSet._updateStrandIdxs(self, idxs)
+        offset = self._strandSet._part._baseOffset
+        self._baseIdxLow = idxs[0] - offset
+        self._baseIdxHigh = idxs[1] - offset
     # end def
 
     def setOligo(self, newOligo, emitSignal=True):
+        self._invalidateOligoStrands()
         self._oligo = newOligo
+        self._invalidateOligoStrands()
         if emitSignal:
             self.strandHasNewOligoSignal.emit(self)
     # end def
@@ -724,8 +874,6 @@ class Strand(QObject):
         strand to newIdxs
 
         """
-        decs = self._decorators
-        mods = self._modifiers
         cIdxL, cIdxH = self.idxs()
         nIdxL, nIdxH = newIdxs
 
@@ -786,7 +934,7 @@ class Strand(QObject):
     # end def
 
     def hasDecoratorAt(self, idx):
-        return idx in self._decorators
+        return self._decorators is not None and idx in self._decorators
     # end def
 
     def hasInsertion(self):
@@ -794,22 +942,16 @@ class Strand(QObject):
         Iterate through dict of insertions for this strand's virtualhelix
         and return True of any of the indices overlap with the strand.
         """
-        coord = self.virtualHelix().coord()
-        insts = self.part().insertions()[coord]
-        for i in range(self._baseIdxLow, self._baseIdxHigh+1):
-            if i in insts:
-                return True
-        return False
+        return len(self.insertionsOnStrand()) > 0
     # end def
 
     def hasInsertionAt(self, idx):
         coord = self.virtualHelix().coord()
-        insts = self.part().insertions()[coord]
-        return idx in insts
+        return self.part().insertionAt(coord, idx) is not None
     # end def
 
     def hasModifierAt(self, idx):
-        return idx in self._modifiers
+        return self._modifiers is not None and idx in self._modifiers
     # end def
 
     def shallowCopy(self):
@@ -823,7 +965,8 @@ class Strand(QObject):
         nS._strand5p = self._strand5p
         nS._strand3p = self._strand3p
         # required to shallow copy the dictionary
-        nS._decorators = dict(self._decorators.items())
+        if self._decorators:
+            nS._decorators = dict(self._decorators)
         nS._sequence = None  # self._sequence
         return nS
     # end def
@@ -836,10 +979,11 @@ class Strand(QObject):
         """
         nS = Strand(strandSet, *self.idxs())
         nS._oligo = oligo
-        decs = nS._decorators
-        for key, decOrig in self._decorators:
-            decs[key] = decOrig.deepCopy()
-        # end fo
+        if self._decorators:
+            decs = nS._decorators = {}
+            for key, decOrig in self._decorators.iteritems():
+                decs[key] = decOrig.deepCopy()
+            # end for
         nS._sequence = self._sequence
         return nS
     # end def
@@ -869,6 +1013,15 @@ class Strand(QObject):
             # thanks to multiple selections
         # end def
 
+        def _invalidateXoverCandidates(self, part):
+            """Crossover ends of the strand may move with it."""
+            std = self.strand
+            if std._strand5p is not None or std._strand3p is not None:
+                oI, nI = self.oldIndices, self.newIdxs
+                part._invalidateXoverCandidates(std.strandSet(), \
+                                    min(oI[0], nI[0]), max(oI[1], nI[1]))
+        # end def
+
         def redo(self):
             std = self.strand
             nI = self.newIdxs
@@ -877,6 +1030,8 @@ class Strand(QObject):
 
             std.oligo().incrementLength(self.delta)
             std.setIdxs(nI)
+            std._invalidateTotalLength()
+            self._invalidateXoverCandidates(part)
             if strandSet.isStaple():
                 
                 std.reapplySequence()
@@ -896,6 +1051,8 @@ class Strand(QObject):
 
             std.oligo().decrementLength(self.delta)
             std.setIdxs(oI)
+            std._invalidateTotalLength()
+            self._invalidateXoverCandidates(part)
             if strandSet.isStaple():
                 std.reapplySequence()
             std.strandResizedSignal.emit(std, oI)
@@ -911,11 +1068,10 @@ class Strand(QObject):
         def __init__(self, strand, idx, length):
             super(Strand.AddInsertionCommand, self).__init__()
             self._strand = strand
-            coord = strand.virtualHelix().coord()
-            self._insertions = strand.part().insertions()[coord]
+            self._coord = strand.virtualHelix().coord()
             self._idx = idx
             self._length = length
-            self._insertion = Insertion(idx, length)
+            self._insertion = Insertion(idx, length, strand.part())
             self._compStrand = \
                         strand.strandSet().complementStrandSet().getStrand(idx)
         # end def
@@ -924,7 +1080,10 @@ class Strand(QObject):
             strand = self._strand
             cStrand = self._compStrand
             inst = self._insertion
-            self._insertions[self._idx] = inst
+            strand.part()._addInsertion(self._coord, inst)
+            strand._invalidateTotalLength()
+            if cStrand:
+                cStrand._invalidateTotalLength()
             strand.oligo().incrementLength(inst.length())
             strand.strandInsertionAddedSignal.emit(strand, inst)
             if cStrand:
@@ -940,7 +1099,10 @@ class Strand(QObject):
             if cStrand:
                 cStrand.oligo().decrementLength(inst.length())
             idx = self._idx
-            del self._insertions[idx]
+            strand.part()._removeInsertion(self._coord, idx)
+            strand._invalidateTotalLength()
+            if cStrand:
+                cStrand._invalidateTotalLength()
             strand.strandInsertionRemovedSignal.emit(strand, idx)
             if cStrand:
                 cStrand.strandInsertionRemovedSignal.emit(cStrand, idx)
@@ -952,9 +1114,8 @@ class Strand(QObject):
             super(Strand.RemoveInsertionCommand, self).__init__()
             self._strand = strand
             self._idx = idx
-            coord = strand.virtualHelix().coord()
-            self._insertions = strand.part().insertions()[coord]
-            self._insertion = self._insertions[idx]
+            self._coord = coord = strand.virtualHelix().coord()
+            self._insertion = strand.part().insertionAt(coord, idx)
             self._compStrand = \
                         strand.strandSet().complementStrandSet().getStrand(idx)
         # end def
@@ -967,7 +1128,10 @@ class Strand(QObject):
             if cStrand:
                 cStrand.oligo().decrementLength(inst.length())
             idx = self._idx
-            del self._insertions[idx]
+            strand.part()._removeInsertion(self._coord, idx)
+            strand._invalidateTotalLength()
+            if cStrand:
+                cStrand._invalidateTotalLength()
             strand.strandInsertionRemovedSignal.emit(strand, idx)
             if cStrand:
                 cStrand.strandInsertionRemovedSignal.emit(cStrand, idx)
@@ -976,10 +1140,12 @@ class Strand(QObject):
         def undo(self):
             strand = self._strand
             cStrand = self._compStrand
-            coord = strand.virtualHelix().coord()
             inst = self._insertion
             strand.oligo().incrementLength(inst.length())
-            self._insertions[self._idx] = inst
+            strand.part()._addInsertion(self._coord, inst)
+            strand._invalidateTotalLength()
+            if cStrand:
+                cStrand._invalidateTotalLength()
             strand.strandInsertionAddedSignal.emit(strand, inst)
             if cStrand:
                 cStrand.oligo().incrementLength(inst.length())
@@ -996,11 +1162,11 @@ class Strand(QObject):
         def __init__(self, strand, idx, newLength):
             super(Strand.ChangeInsertionCommand, self).__init__()
             self._strand = strand
-            coord = strand.virtualHelix().coord()
-            self._insertions = strand.part().insertions()[coord]
+            self._coord = coord = strand.virtualHelix().coord()
+            self._insertion = strand.part().insertionAt(coord, idx)
             self._idx = idx
             self._newLength = newLength
-            self._oldLength = self._insertions[idx].length()
+            self._oldLength = self._insertion.length()
             self._compStrand = \
                         strand.strandSet().complementStrandSet().getStrand(idx)
         # end def
@@ -1008,8 +1174,12 @@ class Strand(QObject):
         def redo(self):
             strand = self._strand
             cStrand = self._compStrand
-            inst = self._insertions[self._idx]
-            inst.setLength(self._newLength)
+            inst = self._insertion
+            strand.part()._changeInsertionLength(self._coord, self._idx,
+                                                            self._newLength)
+            strand._invalidateTotalLength()
+            if cStrand:
+                cStrand._invalidateTotalLength()
             strand.oligo().incrementLength(self._newLength - self._oldLength)
             strand.strandInsertionChangedSignal.emit(strand, inst)
             if cStrand:
@@ -1021,8 +1191,12 @@ class Strand(QObject):
         def undo(self):
             strand = self._strand
             cStrand = self._compStrand
-            inst = self._insertions[self._idx]
-            inst.setLength(self._oldLength)
+            inst = self._insertion
+            strand.part()._changeInsertionLength(self._coord, self._idx,
+                                                            self._oldLength)
+            strand._invalidateTotalLength()
+            if cStrand:
+                cStrand._invalidateTotalLength()
             strand.oligo().decrementLength(self._newLength - self._oldLength)
             strand.strandInsertionChangedSignal.emit(strand, inst)
             if cStrand:
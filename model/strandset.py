@@ -23,6 +23,8 @@
 # http://www.opensource.org/licenses/mit-license.php
 
 import random
+from array import array
+from bisect import bisect_left, bisect_right
 from operator import itemgetter
 from itertools import izip, repeat
 
@@ -53,8 +55,16 @@ class StrandSet(QObject):
         self._virtualHelix = virtualHelix
         self._doc = virtualHelix.document()
         self._strandList = []
+        # sorted stored low and high indices (see Strand), parallel to
+        # self._strandList
+        self._lowIdxs = array('i')
+        self._highIdxs = array('i')
+        # per-base owners live in the part-wide address map; a strand keeps
+        # its slot for as long as it is in the set, so inserting into
+        # _strandList never shifts the owner entries of other strands
+        self._part = part = virtualHelix.part()
+        self._ownerRow = part._allocBaseOwnerRow(self)
         self._undoStack = None
-        self._lastStrandSetIndex = None
         self._strandType = strandType
     # end def
 
@@ -73,7 +83,7 @@ class StrandSet(QObject):
     # end def
 
     ### SIGNALS ###
-    strandsetStrandAddedSignal = pyqtSignal(QObject, QObject)  # strandset, strand
+    strandsetStrandAddedSignal = pyqtSignal(QObject, object)  # strandset, strand
 
     ### SLOTS ###
 
@@ -105,20 +115,15 @@ class StrandSet(QObject):
     # end def
 
     def getNeighbors(self, strand):
-        isInSet, overlap, strandSetIdx = self._findIndexOfRangeFor(strand)
-        sList = self._strandList
-        if isInSet:
-            if strandSetIdx > 0:
-                lowStrand = sList[strandSetIdx - 1]
-            else:
-                lowStrand = None
-            if strandSetIdx < len(sList) - 1:
-                highStrand = sList[strandSetIdx + 1]
-            else:
-                highStrand = None
-            return lowStrand, highStrand
-        else:
+        """
+        Returns the (low, high) neighbors of strand in the set, either of
+        which may be None. The links are kept up to date whenever
+        _strandList changes, so no search is needed.
+        """
+        if strand._strandSet is not self or \
+                                    strand not in self._part._ownerSlots:
             raise IndexError
+        return strand._lowNeighbor, strand._highNeighbor
     # end def
 
     def complementStrandSet(self):
@@ -138,37 +143,22 @@ class StrandSet(QObject):
         Returns the (tight) bounds of the contiguous stretch of unpopulated
         bases that includes the baseIdx.
         """
-        lowIdx, highIdx = 0, self.partMaxBaseIdx()  # init the return values
-        lenStrands = len(self._strandList)
-
-        # not sure how to set this up this to help in caching
-        # lastIdx = self._lastStrandSetIndex
-
-        if lenStrands == 0:  # empty strandset, just return the part bounds
-            return (lowIdx, highIdx)
-
-        low = 0              # index of the first (left-most) strand
-        high = lenStrands    # index of the last (right-most) strand
-        while low < high:    # perform binary search to find empty region
-            mid = (low + high) / 2
-            midStrand = self._strandList[mid]
-            mLow, mHigh = midStrand.idxs()
-            if baseIdx < mLow:  # baseIdx is to the left of crntStrand
-                high = mid   # continue binary search to the left
-                highIdx = mLow - 1  # set highIdx to left of crntStrand
-            elif baseIdx > mHigh:   # baseIdx is to the right of crntStrand
-                low = mid + 1    # continue binary search to the right
-                lowIdx = mHigh + 1  # set lowIdx to the right of crntStrand
-            else:
-                return (None, None)  # baseIdx was not empty
-        self._lastStrandSetIndex = (low + high) / 2  # set cache
+        if self.getStrand(baseIdx) is not None:
+            return (None, None)  # baseIdx was not empty
+        lows, highs = self._lowIdxs, self._highIdxs
+        offset = self._part._baseOffset
+        # first strand that ends at or after baseIdx
+        i = bisect_left(highs, baseIdx - offset)
+        lowIdx = highs[i - 1] + 1 + offset if i > 0 else 0
+        highIdx = lows[i] - 1 + offset if i < len(lows) \
+                                                else self.partMaxBaseIdx()
         return (lowIdx, highIdx)
     # end def
 
     def indexOfRightmostNonemptyBase(self):
         """Returns the high baseIdx of the last strand, or 0."""
-        if len(self._strandList) > 0:
-            return self._strandList[-1].highIdx()
+        if len(self._highIdxs) > 0:
+            return self._highIdxs[-1] + self._part._baseOffset
         else:
             return 0
 
@@ -207,11 +197,34 @@ class StrandSet(QObject):
             return -1
     # end def
 
+    def createStrands(self, ranges, useUndoStack=True):
+        """
+        Creates a strand for each (baseIdxLow, baseIdxHigh) pair in ranges
+        with a single command. The ranges are validated as a batch: they must
+        lie within the part and may overlap neither each other nor any
+        existing strand. Returns True if the strands were created.
+        """
+        ranges = sorted(ranges)
+        if len(ranges) == 0:
+            return False
+        maxIdx = self.partMaxBaseIdx()
+        prevHigh = -1
+        for lo, hi in ranges:
+            if lo <= prevHigh or lo > hi or hi > maxIdx or \
+                                                    self.hasStrandAt(lo, hi):
+                return False
+            prevHigh = hi
+        c = StrandSet.CreateStrandsCommand(self, ranges)
+        util.execCommandList(self, [c], desc="Create strands", \
+                                                useUndoStack=useUndoStack)
+        return True
+    # end def
+
     def createDeserializedStrand(self, baseIdxLow, baseIdxHigh, useUndoStack=False):
         """
         Passes a strand to AddStrandCommand that was read in from file input.
-        Omits the step of checking _couldStrandInsertAtLastIndex, since
-        we assume that deserialized strands will not cause collisions.
+        Asserts rather than checks for collisions, since we assume that
+        deserialized strands will fit.
         """
         boundsLow, boundsHigh = self.getBoundsOfEmptyRegionContaining(baseIdxLow)
         assert(baseIdxLow < baseIdxHigh)
@@ -232,6 +245,7 @@ class StrandSet(QObject):
         the command in the case the command is instantiated part of a larger
         command
         """
+        self._part._assertNotInBatch("removeStrand")
         cmds = []
         if strandSetIdx == None:
             isInSet, overlap, strandSetIdx = self._findIndexOfRangeFor(strand)
@@ -245,12 +259,32 @@ class StrandSet(QObject):
         return strandSetIdx
     # end def
 
+    def removeStrands(self, strands, useUndoStack=True, solo=True):
+        """
+        Removes every strand in strands, which must all belong to this
+        StrandSet, with a single command. See removeStrand for solo.
+        """
+        self._part._assertNotInBatch("removeStrands")
+        cmds = []
+        if self.isScaffold():
+            oligos = set()
+            for strand in strands:
+                if strand.sequence() == None:
+                    continue
+                oligo = strand.oligo()
+                if oligo not in oligos:
+                    oligos.add(oligo)
+                    cmds.append(oligo.applySequenceCMD(None))
+        for strand in strands:
+            cmds += strand.clearDecoratorCommands()
+        cmds.append(StrandSet.RemoveStrandsCommand(self, strands, solo))
+        util.execCommandList(self, cmds, desc="Remove strands", \
+                                                useUndoStack=useUndoStack)
+    # end def
+
     def removeAllStrands(self, useUndoStack=True):
-        # copy the list because we are going to shrink it and that's
-        # a no no with iterators
-        #temp = [x for x in self._strandList]
-        for strand in list(self._strandList):#temp:
-            self.removeStrand(strand, 0, useUndoStack, solo=False)
+        if len(self._strandList) > 0:
+            self.removeStrands(list(self._strandList), useUndoStack, solo=False)
         # end def
 
     def mergeStrands(self, priorityStrand, otherStrand, useUndoStack=True):
@@ -259,6 +293,7 @@ class StrandSet(QObject):
         The oligo of priority should be propagated to the other and all of
         its connections.
         """
+        self._part._assertNotInBatch("mergeStrands")
         lowAndHighStrands = self.strandsCanBeMerged(priorityStrand, otherStrand)
         if lowAndHighStrands:
             strandLow, strandHigh = lowAndHighStrands
@@ -297,6 +332,7 @@ class StrandSet(QObject):
         Break strand into two strands. Reapply sequence by default (disabled
         during autostaple).
         """
+        self._part._assertNotInBatch("splitStrand")
         if self.strandCanBeSplit(strand, baseIdx):
             isInSet, overlap, strandSetIdx = self._findIndexOfRangeFor(strand)
             if isInSet:
@@ -355,109 +391,99 @@ class StrandSet(QObject):
         return "scaffold" if self._strandType == StrandType.Scaffold else "staple"
 
     def hasStrandAt(self, idxLow, idxHigh):
-        """
-        """
-        dummyStrand = Strand(self, idxLow, idxHigh)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        return len(strandList) > 0
+        """Returns True if any strand overlaps the range [idxLow, idxHigh]."""
+        i, j = self._overlappingSlice(idxLow, idxHigh)
+        return i < j
     # end def
 
     def getOverlappingStrands(self, idxLow, idxHigh):
-        dummyStrand = Strand(self, idxLow, idxHigh)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        return strandList
+        """Returns a list of the strands overlapping [idxLow, idxHigh]."""
+        i, j = self._overlappingSlice(idxLow, idxHigh)
+        return self._strandList[i:j]
     # end def
 
     def hasStrandAtAndNoXover(self, idx):
-        dummyStrand = Strand(self, idx, idx)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        if len(strandList) > 0:
-            return False if strandList[0].hasXoverAt(idx) else True
-        else:
+        strand = self.getStrand(idx)
+        if strand is None:
             return False
+        return False if strand.hasXoverAt(idx) else True
     # end def
 
     def hasNoStrandAtOrNoXover(self, idx):
-        dummyStrand = Strand(self, idx, idx)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        if len(strandList) > 0:
-            return False if strandList[0].hasXoverAt(idx) else True
-        else:
+        strand = self.getStrand(idx)
+        if strand is None:
             return True
+        return False if strand.hasXoverAt(idx) else True
     # end def
 
     def getIndexToInsert(self, idxLow, idxHigh):
         """
+        Returns a tuple (canInsert, idx), where idx is the _strandList index
+        at which a strand spanning [idxLow, idxHigh] would be inserted, or
+        None if the range overlaps an existing strand.
         """
-        canInsert = True
-        dummyStrand = Strand(self, idxLow, idxHigh)
-        if self._couldStrandInsertAtLastIndex(dummyStrand):
-            return canInsert, self._lastStrandSetIndex
-        isInSet, overlap, idx = self._findIndexOfRangeFor(dummyStrand)
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        if overlap:
-            canInsert = False
-        return canInsert, idx
+        i, j = self._overlappingSlice(idxLow, idxHigh)
+        if i < j:
+            return False, None
+        return True, i
     # end def
 
     def getStrand(self, baseIdx):
         """Returns the strand that overlaps with baseIdx."""
-        dummyStrand = Strand(self, baseIdx, baseIdx)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        return strandList[0] if len(strandList) > 0 else None
+        part, row = self._part, self._ownerRow
+        # the row is reused by another set while the helix is removed
+        if 0 <= baseIdx <= part._maxBase and part._ownerRowSets[row] is self:
+            slot = part._baseOwners[row * part._ownerStride + \
+                                    part._ownerZero + baseIdx]
+            if slot != -1:
+                return part._ownerStrands[slot]
+        return None
     # end def
 
     def getLegacyArray(self):
-        """docstring for getLegacyArray"""
+        """
+        Returns a list of [5' helix, 5' idx, 3' helix, 3' idx] lists, one
+        per base, as stored by the legacy file format.
+        """
+        flat = self.getLegacyFlatArray()
+        it = iter(flat)
+        return [list(base) for base in izip(it, it, it, it)]
+    # end def
+
+    def getLegacyFlatArray(self):
+        """
+        Flat version of getLegacyArray: an array('i') holding the four
+        entries of each base back to back. Strand interiors are filled with
+        one strided slice assignment per column, so only the endpoints are
+        set per strand.
+        """
         num = self._virtualHelix.number()
-        ret = [[-1, -1, -1, -1] for i in range(self.part().maxBaseIdx() + 1)]
+        ret = array('i', [-1]) * (4 * (self.part().maxBaseIdx() + 1))
         if self.isDrawn5to3():
             for strand in self._strandList:
                 lo, hi = strand.idxs()
                 assert strand.idx5Prime() == lo and strand.idx3Prime() == hi
                 # map the first base (5' xover if necessary)
+                i = 4 * lo
                 s5p = strand.connection5p()
                 if s5p != None:
-                    ret[lo][0] = s5p.virtualHelix().number()
-                    ret[lo][1] = s5p.idx3Prime()
-                ret[lo][2] = num
-                ret[lo][3] = lo + 1
+                    ret[i] = s5p.virtualHelix().number()
+                    ret[i + 1] = s5p.idx3Prime()
+                ret[i + 2] = num
+                ret[i + 3] = lo + 1
                 # map the internal bases
-                for idx in range(lo + 1, hi):
-                    ret[idx][0] = num
-                    ret[idx][1] = idx - 1
-                    ret[idx][2] = num
-                    ret[idx][3] = idx + 1
+                if hi - lo > 1:
+                    self._fillLegacyInterior(ret, num, lo, hi,
+                                             xrange(lo, hi - 1),
+                                             xrange(lo + 2, hi + 1))
                 # map the last base (3' xover if necessary)
-                ret[hi][0] = num
-                ret[hi][1] = hi - 1
+                i = 4 * hi
+                ret[i] = num
+                ret[i + 1] = hi - 1
                 s3p = strand.connection3p()
                 if s3p != None:
-                    ret[hi][2] = s3p.virtualHelix().number()
-                    ret[hi][3] = s3p.idx5Prime()
+                    ret[i + 2] = s3p.virtualHelix().number()
+                    ret[i + 3] = s3p.idx5Prime()
                 # end if
             # end for
         # end if
@@ -466,25 +492,26 @@ class StrandSet(QObject):
                 lo, hi = strand.idxs()
                 assert strand.idx3Prime() == lo and strand.idx5Prime() == hi
                 # map the first base (3' xover if necessary)
-                ret[lo][0] = num
-                ret[lo][1] = lo + 1
+                i = 4 * lo
+                ret[i] = num
+                ret[i + 1] = lo + 1
                 s3p = strand.connection3p()
                 if s3p != None:
-                    ret[lo][2] = s3p.virtualHelix().number()
-                    ret[lo][3] = s3p.idx5Prime()
+                    ret[i + 2] = s3p.virtualHelix().number()
+                    ret[i + 3] = s3p.idx5Prime()
                 # map the internal bases
-                for idx in range(lo + 1, hi):
-                    ret[idx][0] = num
-                    ret[idx][1] = idx + 1
-                    ret[idx][2] = num
-                    ret[idx][3] = idx - 1
+                if hi - lo > 1:
+                    self._fillLegacyInterior(ret, num, lo, hi,
+                                             xrange(lo + 2, hi + 1),
+                                             xrange(lo, hi - 1))
                 # map the last base (5' xover if necessary)
-                ret[hi][2] = num
-                ret[hi][3] = hi - 1
+                i = 4 * hi
+                ret[i + 2] = num
+                ret[i + 3] = hi - 1
                 s5p = strand.connection5p()
                 if s5p != None:
-                    ret[hi][0] = s5p.virtualHelix().number()
-                    ret[hi][1] = s5p.idx3Prime()
+                    ret[i] = s5p.virtualHelix().number()
+                    ret[i + 1] = s5p.idx3Prime()
                 # end if
             # end for
         return ret
@@ -494,144 +521,180 @@ class StrandSet(QObject):
     def _addToStrandList(self, strand, idx):
         """Inserts strand into the _strandList at idx."""
         self._strandList.insert(idx, strand)
+        self._lowIdxs.insert(idx, strand._baseIdxLow)
+        self._highIdxs.insert(idx, strand._baseIdxHigh)
+        self._part._claimBaseOwners(self._ownerRow, strand)
+        sList = self._strandList
+        lowStrand = sList[idx - 1] if idx > 0 else None
+        highStrand = sList[idx + 1] if idx + 1 < len(sList) else None
+        strand._lowNeighbor, strand._highNeighbor = lowStrand, highStrand
+        if lowStrand is not None:
+            lowStrand._highNeighbor = strand
+        if highStrand is not None:
+            highStrand._lowNeighbor = strand
 
     def _removeFromStrandList(self, strand):
         """Remove strand from _strandList."""
         self._doc.removeStrandFromSelection(strand)  # make sure the strand is no longer selected
-        self._strandList.remove(strand)
-
-    def _couldStrandInsertAtLastIndex(self, strand):
-        """Verification of insertability based on cached last index."""
-        lastInd = self._lastStrandSetIndex
-        strandList = self._strandList
-        if lastInd == None or lastInd > (len(strandList) - 1):
-            self._lastStrandSetIndex = None
-            return False
-        else:
-            sTestHigh = strandList[lastInd].lowIdx() if lastInd < len(strandList) else self.partMaxBaseIdx()
-            sTestLow = strandList[lastInd - 1].highIdx() if lastInd > 0 else - 1
-            sLow, sHigh = strand.idxs()
-            if sTestLow < sLow and sHigh < sTestHigh:
-                return True
-            else:
-                return False
-
-    def _findOverlappingRanges(self, qstrand, useCache=False):
+        isInSet, overlap, idx = self._findIndexOfRangeFor(strand)
+        if not isInSet:
+            raise IndexError
+        self._strandList.pop(idx)
+        self._lowIdxs.pop(idx)
+        self._highIdxs.pop(idx)
+        self._part._releaseBaseOwners(self._ownerRow, strand)
+        lowStrand, highStrand = strand._lowNeighbor, strand._highNeighbor
+        if lowStrand is not None:
+            lowStrand._highNeighbor = highStrand
+        if highStrand is not None:
+            highStrand._lowNeighbor = lowStrand
+        strand._lowNeighbor = strand._highNeighbor = None
+
+    def _resetStrandList(self, strandList):
+        """Replaces _strandList with strandList, which must be sorted."""
+        for strand in self._strandList:
+            self._part._releaseBaseOwners(self._ownerRow, strand)
+            strand._lowNeighbor = strand._highNeighbor = None
+        self._strandList = strandList
+        self._refreshIdxArrays()
+        self._relinkNeighbors()
+        self._rebuildBaseOwners()
+
+    def _mergeIntoStrandList(self, strands):
         """
-        a binary search for the strands in self._strandList overlapping with
-        a query strands, or qstrands, indices.
-
-        Useful for operations on complementary strands such as applying a
-        sequence
+        Inserts strands, which must be sorted and must not overlap any strand
+        in the set, into _strandList with a single merge pass.
+        """
+        oldList = self._strandList
+        lows = self._lowIdxs
+        newList = []
+        i = 0
+        for strand in strands:
+            j = bisect_left(lows, strand._baseIdxLow, i)
+            newList.extend(oldList[i:j])
+            newList.append(strand)
+            i = j
+        newList.extend(oldList[i:])
+        self._strandList = newList
+        self._refreshIdxArrays()
+        self._relinkNeighbors()
+        for strand in strands:
+            self._part._claimBaseOwners(self._ownerRow, strand)
+
+    def _removeStrandsFromList(self, strands):
+        """Removes strands from _strandList with a single filtering pass."""
+        removed = set(strands)
+        for strand in strands:
+            self._doc.removeStrandFromSelection(strand)
+            self._part._releaseBaseOwners(self._ownerRow, strand)
+            strand._lowNeighbor = strand._highNeighbor = None
+        self._strandList = [s for s in self._strandList if s not in removed]
+        self._refreshIdxArrays()
+        self._relinkNeighbors()
+
+    def _refreshIdxArrays(self):
+        """Rebuilds the sorted index arrays from _strandList."""
+        sList = self._strandList
+        self._lowIdxs = array('i', [s._baseIdxLow for s in sList])
+        self._highIdxs = array('i', [s._baseIdxHigh for s in sList])
+
+    def _relinkNeighbors(self):
+        """Rebuilds the low/high neighbor links from _strandList."""
+        prev = None
+        for strand in self._strandList:
+            strand._lowNeighbor = prev
+            if prev is not None:
+                prev._highNeighbor = strand
+            prev = strand
+        if prev is not None:
+            prev._highNeighbor = None
+
+    def _updateStrandIdxs(self, strand, idxs):
+        """
+        Called by Strand.setIdxs before strand takes on the new idxs, so the
+        sorted index arrays stay in step with strands already in the set.
+        Copies of strands (e.g. during a split or merge) are not in the set
+        and are ignored.
+        """
+        isInSet, overlap, idx = self._findIndexOfRangeFor(strand)
+        if isInSet:
+            offset = self._part._baseOffset
+            self._lowIdxs[idx] = idxs[0] - offset
+            self._highIdxs[idx] = idxs[1] - offset
+            self._part._moveBaseOwners(self._ownerRow, strand, idxs)
+    # end def
 
-        This is an generator for now
+    def _rebuildBaseOwners(self):
+        """
+        Claims owner slots for the strands in _strandList, whose bases in
+        this set's row of the part's owner map must be empty.
+        """
+        part, row = self._part, self._ownerRow
+        for strand in self._strandList:
+            part._claimBaseOwners(row, strand)
+    # end def
 
-        Strategy:
-        1.
-            search the _strandList for a strand the first strand that has a
-            highIndex >= lowIndex of the query strand.
-            save that strandSet index as sSetIndexLow.
-            if No strand satisfies this condition, return an empty list
+    def _fillLegacyInterior(self, flat, num, lo, hi, idxs5p, idxs3p):
+        """
+        Fills the legacy entries of bases lo+1 to hi-1 in flat, pointing
+        them at this helix and at the base indices in idxs5p and idxs3p.
+        """
+        i, j = 4 * (lo + 1), 4 * hi
+        nums = array('i', [num]) * (hi - lo - 1)
+        flat[i:j:4] = nums
+        flat[i + 1:j:4] = array('i', idxs5p)
+        flat[i + 2:j:4] = nums
+        flat[i + 3:j:4] = array('i', idxs3p)
+    # end def
 
-            Unless it matches the query strand's lowIndex exactly,
-            Step 1 is O(log N) where N in length of self._strandList to the max,
-            that is it needs to exhaust the search
+    def _xoverIdxs(self):
+        """
+        Returns the set of base indices at which a strand has a crossover,
+        i.e. where hasNoStrandAtOrNoXover is False.
+        """
+        ret = set()
+        for strand in self._strandList:
+            lo, hi = strand.idxs()
+            if strand.connectionHigh() is not None:
+                ret.add(hi)
+            if lo != hi and strand.connectionLow() is not None:
+                ret.add(lo)
+        return ret
+    # end def
 
-            conversely you could search for first strand that has a
-            lowIndex LESS than or equal to the lowIndex of the query strand.
+    def _overlappingSlice(self, idxLow, idxHigh):
+        """
+        Returns (i, j) such that self._strandList[i:j] are exactly the
+        strands overlapping [idxLow, idxHigh].
 
-        2.
-            starting at self._strandList[sSetIndexLow] test each strand to see if
-            it's indexLow is LESS than or equal to qstrand.indexHigh.  If it is
-            yield/return that strand.  If it's GREATER than the indexHigh, or
-            you run out of strands to check, the generator terminates
+        Strands in a StrandSet never overlap, so both the low and the high
+        indices are sorted and two bisections bound the overlapping run:
+        i is the first strand with highIdx >= idxLow, and j is one past
+        the last strand with lowIdx <= idxHigh.
         """
-        strandList = self._strandList
-        lenStrands = len(strandList)
-        if lenStrands == 0:
-            return
-        # end if
+        offset = self._part._baseOffset
+        i = bisect_left(self._highIdxs, idxLow - offset)
+        j = bisect_right(self._lowIdxs, idxHigh - offset)
+        return i, j
+    # end def
 
-        low = 0
-        high = lenStrands
-        qLow, qHigh = qstrand.idxs()
+    def _findOverlappingRanges(self, qstrand):
+        """
+        Returns an iterator over the strands in self._strandList overlapping
+        with the indices of a query strand, or qstrand.
 
-        # Step 1: get rangeIndexLow with a binary search
-        if useCache:  # or self.doesLastSetIndexMatch(qstrand, strandList):
-            # cache match!
-            sSetIndexLow = self._lastStrandSetIndex
-        else:
-            sSetIndexLow = -1
-            while low < high:
-                mid = (low + high) / 2
-                midStrand = strandList[mid]
-
-                # pre get indices from the currently tested strand
-                mLow, mHigh = midStrand.idxs()
-
-                if mHigh == qLow:
-                    # match, break out of while loop
-                    sSetIndexLow = mid
-                    break
-                elif mHigh > qLow:
-                    # store the candidate index
-                    sSetIndexLow = mid
-                    # adjust the high index to find a better candidate if
-                    # it exists
-                    high = mid
-                # end elif
-                else:  # mHigh < qLow
-                    # If a strand exists it must be a higher rangeIndex
-                    # leave the high the same
-                    low = mid + 1
-                #end elif
-            # end while
-        # end else
-
-        # Step 2: create a generator on matches
-        # match on whether the tempStrand's lowIndex is
-        # within the range of the qStrand
-        if sSetIndexLow > -1:
-            tempStrands = iter(strandList[sSetIndexLow:])
-            tempStrand = tempStrands.next()
-            qHigh += 1  # bump it up for a more efficient comparison
-            i = 0   # use this to
-            while tempStrand and tempStrand.lowIdx() < qHigh:
-                yield tempStrand
-                # use a next and a default to cause a break condition
-                tempStrand = next(tempStrands, None)
-                i += 1
-            # end while
-
-            # cache the last index we left of at
-            i = sSetIndexLow + i
-            """
-            if
-            1. we ran out of strands to test adjust
-                OR
-            2. the end condition tempStrands highIndex is still inside the
-            qstrand but not equal to the end point
-                adjust i down 1
-            otherwise
-            """
-            if not tempStrand or tempStrand.highIdx() < qHigh - 1:
-                i -= 1
-            # assign cache but double check it's a valid index
-            self._lastStrandSetIndex = i if -1 < i < lenStrands else None
-            return
-        else:
-            # no strand was found
-            # go ahead and clear the cache
-            self._lastStrandSetIndex = None if len(self._strandList) > 0 else 0
-            return
+        Useful for operations on complementary strands such as applying a
+        sequence.
+        """
+        i, j = self._overlappingSlice(*qstrand.idxs())
+        return iter(self._strandList[i:j])
     # end def
 
     def getStrandIndex(self, strand):
-        try:
-            ind = self._strandList.index(strand)
-            return (True, ind)
-        except ValueError:
-            return (False, 0)
+        isInSet, overlap, idx = self._findIndexOfRangeFor(strand)
+        if isInSet:
+            return (True, idx)
+        return (False, 0)
     # end def
 
     def _findIndexOfRangeFor(self, strand):
@@ -653,99 +716,13 @@ class StrandSet(QObject):
             idx is the index where the strand could be inserted if found
             is False and overlap is False.
         """
-        # setup
-        strandList = self._strandList
-        lastIdx = self._lastStrandSetIndex
-        lenStrands = len(strandList)
-        # base case: empty list, can insert at 0
-        if lenStrands == 0:
-            return (False, False, 0)
-        # check cache
-        if lastIdx:
-            if lastIdx < lenStrands and strandList[lastIdx] == strand:
-                return (True, False, lastIdx)
-        # init search bounds
-        low, high = 0, lenStrands
-        sLow, sHigh = strand.idxs()
-        # perform binary search
-        while low < high:
-            mid = (low + high) / 2
-            midStrand = strandList[mid]
-            mLow, mHigh = midStrand.idxs()
-            if midStrand == strand:
-                self._lastStrandSetIndex = mid
-                return (True, False, mid)
-            elif mHigh < sLow:
-                #  strand                [sLow----)
-                # mStrand  (----mHigh]
-                low = mid + 1  # search higher
-            elif mLow > sHigh:
-                #  strand  (----sHigh]
-                # mStrand                [mLow----)
-                high = mid  # search lower
-            else:
-                if mLow <= sLow <= mHigh:
-                    # overlap: right side of mStrand
-                    #  strand         [sLow---------------)
-                    # mStrand  [mLow----------mHigh]
-                    self._lastStrandSetIndex = None
-                    return (False, True, None)
-                elif mLow <= sHigh <= mHigh:
-                    # overlap: left side of mStrand
-                    #  strand  (--------------sHigh]
-                    # mStrand         [mLow-----------mHigh]
-                    self._lastStrandSetIndex = None
-                    return (False, True, None)
-                elif sLow <= mLow and mHigh <= sHigh:
-                    # overlap: strand encompases existing
-                    #  strand  [sLow-------------------sHigh]
-                    # mStrand         [mLow----mHigh]
-                    # note: inverse case is already covered above
-                    self._lastStrandSetIndex = None
-                    return (False, True, None)
-                else:
-                    # strand not in set, here's where you'd insert it
-                    self._lastStrandSetIndex = mid
-                    return (False, False, mid)
-            # end else
-        self._lastStrandSetIndex = low
-        return (False, False, low)
-    # end def
-
-    def _doesLastSetIndexMatch(self, qstrand, strandList):
-        """
-        strandList is passed to save a lookup
-        """
-        lSI = self._lastStrandSetIndex
-        if lSI:
-            qLow, qHigh = qstrand.idxs()
-            tempStrand = strandList[lSI]
-            tLow, tHigh = tempStrand.idxs()
-            if not (qLow <= tLow <= qHigh or qLow <= tHigh <= qHigh):
-                return False
-            else:  # get a difference
-                dif = abs(qLow - tLow)
-                # check neighboring strandList just in case
-                difLow = dif + 1
-                if lSI > 0:
-                    tLow, tHigh = strand[lSI - 1].idxs()
-                    if qLow <= tLow <= qHigh or qLow <= tHigh <= qHigh:
-                        difLow = abs(qLow - tLow)
-                difHigh = dif + 1
-                if lSI < len(strand) - 1:
-                    tLow, tHigh = strand[lSI + 1].idxs()
-                    if qLow <= tLow <= qHigh or qLow <= tHigh <= qHigh:
-                        difHigh = abs(qLow - tLow)
-                # check that the cached strand is in fact the right guy
-                if dif < difLow and dif < difHigh:
-                    return True
-                else:
-                    False
-            # end else
-        # end if
-        else:
-            return False
-        # end else
+        i = bisect_left(self._lowIdxs, strand._baseIdxLow)
+        if i < len(self._strandList) and self._strandList[i] is strand:
+            return (True, False, i)
+        i, j = self._overlappingSlice(*strand.idxs())
+        if i < j:
+            return (False, True, None)
+        return (False, False, i)
     # end def
 
     ### COMMANDS ###
@@ -771,7 +748,7 @@ class StrandSet(QObject):
             # Add the new strand to the StrandSet strandList
             strand = self._strand
             strandSet = self._strandSet
-            strandSet._strandList.insert(self._sSetIdx, strand)
+            strandSet._addToStrandList(strand, self._sSetIdx)
             # Set up the new oligo
             oligo = self._newOligo
             oligo.setStrand5p(strand)
@@ -790,8 +767,7 @@ class StrandSet(QObject):
             # Remove the strand from StrandSet strandList and selectionList
             strand = self._strand
             strandSet = self._strandSet
-            strandSet._doc.removeStrandFromSelection(strand)
-            strandSet._strandList.pop(self._sSetIdx)
+            strandSet._removeFromStrandList(strand)
             # Get rid of the new oligo
             oligo = self._newOligo
             oligo.setStrand5p(None)
@@ -804,145 +780,207 @@ class StrandSet(QObject):
         # end def
     # end class
 
-    class RemoveStrandCommand(QUndoCommand):
+    class CreateStrandsCommand(QUndoCommand):
         """
-        RemoveStrandCommand deletes a strand. It should only be called on
-        strands with no connections to other strands.
+        Create a new Strand, each with its own new Oligo, for every
+        (baseIdxLow, baseIdxHigh) in ranges. ranges must be sorted and
+        must fit in the strandSet. The strands are merged into the
+        strandSet in one pass, and the part is notified once.
         """
-        def __init__(self, strandSet, strand, strandSetIdx, solo=True):
-            super(StrandSet.RemoveStrandCommand, self).__init__()
+        def __init__(self, strandSet, ranges):
+            super(StrandSet.CreateStrandsCommand, self).__init__()
             self._strandSet = strandSet
-            self._strand = strand
-            self._sSetIdx = strandSetIdx
-            self._solo = solo
-            self._oldStrand5p = strand.connection5p()
-            self._oldStrand3p = strand.connection3p()
-            self._oligo = olg = strand.oligo()
-            # only create a new 5p oligo if there is a 3' connection
-            self._newOligo5p = olg.shallowCopy() if self._oldStrand5p else None
-            if olg.isLoop() or self._oldStrand3p == None:
-                self._newOligo3p = olg3p = None
-                if self._newOligo5p:
-                    self._newOligo5p.setLoop(False)
-            else:
-                self._newOligo3p = olg3p = olg.shallowCopy()
-                olg3p.setStrand5p(self._oldStrand3p)
-                colorList = styles.stapColors if strandSet.isStaple() else styles.scafColors
+            self._strands = []
+            self._newOligos = []
+            colorList = styles.stapColors if strandSet.isStaple() else styles.scafColors
+            for baseIdxLow, baseIdxHigh in ranges:
+                strand = Strand(strandSet, baseIdxLow, baseIdxHigh)
                 color = random.choice(colorList).name()
-                olg3p.setColor(color)
-                olg3p.refreshLength()
+                oligo = Oligo(None, color)  # redo will set part
+                oligo.setLength(strand.totalLength())
+                self._strands.append(strand)
+                self._newOligos.append(oligo)
         # end def
 
         def redo(self):
-            # Remove the strand
-            strand = self._strand
             strandSet = self._strandSet
-            # strandSet._removeFromStrandList(strand)
-            strandSet._doc.removeStrandFromSelection(strand)
-            strandSet._strandList.pop(self._sSetIdx)
-            strand5p = self._oldStrand5p
-            strand3p = self._oldStrand3p
-            oligo = self._oligo
-            olg5p = self._newOligo5p
-            olg3p = self._newOligo3p
-
-            #oligo.incrementLength(-strand.totalLength())
-            
-            oligo.removeFromPart()
+            part = strandSet.part()
+            strandSet._mergeIntoStrandList(self._strands)
+            isStaple = strandSet.isStaple()
+            for strand, oligo in izip(self._strands, self._newOligos):
+                oligo.setStrand5p(strand)
+                oligo.addToPart(part)
+                strand.setOligo(oligo)
+                if isStaple:
+                    strand.reapplySequence()
+                strandSet.strandsetStrandAddedSignal.emit(strandSet, strand)
+            # for updating the Slice View displayed helices
+            part.partStrandChangedSignal.emit(part, strandSet.virtualHelix())
+        # end def
+
+        def undo(self):
+            strandSet = self._strandSet
+            part = strandSet.part()
+            strandSet._removeStrandsFromList(self._strands)
+            for strand, oligo in izip(self._strands, self._newOligos):
+                oligo.setStrand5p(None)
+                oligo.removeFromPart()
+                strand.strandRemovedSignal.emit(strand)
+                strand.setOligo(None)
+            # for updating the Slice View displayed helices
+            part.partStrandChangedSignal.emit(part, strandSet.virtualHelix())
+        # end def
+    # end class
 
-            if strand5p != None:
+    class RemoveStrandsCommand(QUndoCommand):
+        """
+        RemoveStrandsCommand deletes several strands of one strandSet at
+        once. Connections from surviving strands into the removed ones are
+        cut, and each oligo that loses strands is replaced by one new oligo
+        per remaining run of connected strands. As with removeStrand, the
+        run that starts at the original oligo's 5' end keeps its color,
+        and so does the first run of a loop.
+        """
+        def __init__(self, strandSet, strands, solo=True):
+            super(StrandSet.RemoveStrandsCommand, self).__init__()
+            self._strandSet = strandSet
+            self._strands = strands = sorted(strands, key=Strand.lowIdx)
+            self._solo = solo
+            removed = set(strands)
+            # (surviving strand, removed strand) pairs for cut connections
+            self._cut5p = []
+            self._cut3p = []
+            self._oldOligos = []
+            self._newOligos = []  # (oligo, strands)
+            self._relabelled = []  # (strand, oligo label before redo)
+            oldOligos = set()
+            colorList = styles.stapColors if strandSet.isStaple() else styles.scafColors
+            for strand in strands:
+                strand5p = strand.connection5p()
+                if strand5p != None and strand5p not in removed:
+                    self._cut5p.append((strand5p, strand))
+                strand3p = strand.connection3p()
+                if strand3p != None and strand3p not in removed:
+                    self._cut3p.append((strand3p, strand))
+                olg = strand.oligo()
+                if olg in oldOligos:
+                    continue
+                oldOligos.add(olg)
+                self._oldOligos.append(olg)
+                order = list(olg.strand5p().generator3pStrand())
+                if olg.isLoop():
+                    # start after a removed strand so no run wraps around
+                    i = [s in removed for s in order].index(True)
+                    order = order[i + 1:] + order[:i + 1]
+                run = []
+                # a removed 5' strand takes the color with it
+                isFirstRun = olg.isLoop() or order[0] not in removed
+                for s in order + [None]:
+                    if s != None and s not in removed:
+                        run.append(s)
+                        continue
+                    if run:
+                        newOlg = olg.shallowCopy()
+                        newOlg.setLoop(False)
+                        newOlg.setStrand5p(run[0])
+                        if not isFirstRun:
+                            newOlg.setColor(random.choice(colorList).name())
+                        newOlg.setLength(sum([x.totalLength() for x in run]))
+                        self._newOligos.append((newOlg, run))
+                        isFirstRun = False
+                        run = []
+                # end for
+            # end for
+        # end def
+
+        def _invalidateXoverCandidates(self, part):
+            """The removed strands and the strands cut from them."""
+            part._invalidateXoverStrands(self._strands)
+            part._invalidateXoverStrands([strand for strand, removed in \
+                                            self._cut5p + self._cut3p])
+        # end def
+
+        def _removeFromList(self):
+            self._strandSet._removeStrandsFromList(self._strands)
+        # end def
+
+        def _restoreToList(self):
+            self._strandSet._mergeIntoStrandList(self._strands)
+        # end def
+
+        def redo(self):
+            strandSet = self._strandSet
+            part = strandSet.part()
+            vh = strandSet.virtualHelix()
+            self._removeFromList()
+            for olg in self._oldOligos:
+                olg.removeFromPart()
+            for strand5p, strand in self._cut5p:
                 strand5p.setConnection3p(None)
-            if strand3p != None:
+            for strand3p, strand in self._cut3p:
                 strand3p.setConnection5p(None)
-
-            # Clear connections and update oligos
-            if strand5p != None:
-                for s5p in oligo.strand5p().generator3pStrand():
-                    Strand.setOligo(s5p, olg5p)
-                olg5p.refreshLength()
-                olg5p.addToPart(strandSet.part())
-                if self._solo:
-                    part = strandSet.part()
-                    vh = strandSet.virtualHelix()
-                    part.partActiveVirtualHelixChangedSignal.emit(part, vh)
-                    #strand5p.strandXover5pChangedSignal.emit(strand5p, strand)
-                strand5p.strandUpdateSignal.emit(strand5p)
-            # end if
-            if strand3p != None:
-                if not oligo.isLoop():
-                    # apply 2nd oligo copy to all 3' downstream strands
-                    for s3p in strand3p.generator3pStrand():
-                        Strand.setOligo(s3p, olg3p)
-                    olg3p.addToPart(strandSet.part())
-                if self._solo:
-                    part = strandSet.part()
-                    vh = strandSet.virtualHelix()
-                    part.partActiveVirtualHelixChangedSignal.emit(part, vh)
-                    # strand.strandXover5pChangedSignal.emit(strand, strand3p)
-                strand3p.strandUpdateSignal.emit(strand3p)
-            # end if
-            # Emit a signal to notify on completion
-            strand.strandRemovedSignal.emit(strand)
+            self._invalidateXoverCandidates(part)
+            for olg, run in self._newOligos:
+                olg._relabel(run, self._relabelled)
+                olg.addToPart(part)
+            # Emit signals to notify on completion
+            for strand in self._strands:
+                strand.strandRemovedSignal.emit(strand)
+            for strand, removedStrand in self._cut5p + self._cut3p:
+                strand.strandUpdateSignal.emit(strand)
+            if self._solo and (self._cut5p or self._cut3p):
+                part.partActiveVirtualHelixChangedSignal.emit(part, vh)
             # for updating the Slice View displayed helices
-            strandSet.part().partStrandChangedSignal.emit(strandSet.part(), strandSet.virtualHelix())
+            part.partStrandChangedSignal.emit(part, vh)
         # end def
 
         def undo(self):
-            # Restore the strand
-            strand = self._strand
             strandSet = self._strandSet
-            # Add the newStrand to the sSet
-            strandSet._addToStrandList(strand, self._sSetIdx)
-            # strandSet._strandList.insert(self._sSetIdx, strand)
-            strand5p = self._oldStrand5p
-            strand3p = self._oldStrand3p
-            oligo = self._oligo
-            olg5p = self._newOligo5p
-            olg3p = self._newOligo3p
-
-            # Restore connections to this strand
-            if strand5p != None:
+            part = strandSet.part()
+            vh = strandSet.virtualHelix()
+            self._restoreToList()
+            for strand5p, strand in self._cut5p:
                 strand5p.setConnection3p(strand)
-
-            if strand3p != None:
+            for strand3p, strand in self._cut3p:
                 strand3p.setConnection5p(strand)
-
-            # oligo.decrementLength(strand.totalLength())
-            
-            # Restore the oligo
-            oligo.addToPart(strandSet.part())
-            if olg5p:
-                olg5p.removeFromPart()
-            if olg3p:
-                olg3p.removeFromPart()
-            for s5p in oligo.strand5p().generator3pStrand():
-                Strand.setOligo(s5p, oligo)
-            # end for
-
-            # Emit a signal to notify on completion
-            strandSet.strandsetStrandAddedSignal.emit(strandSet, strand)
+            self._invalidateXoverCandidates(part)
+            for olg, run in self._newOligos:
+                olg.removeFromPart()
+            for olg in self._oldOligos:
+                olg.addToPart(part)
+            Oligo._restoreLabels(self._relabelled)
+            # Emit signals to notify on completion
+            for strand in self._strands:
+                strandSet.strandsetStrandAddedSignal.emit(strandSet, strand)
             # for updating the Slice View displayed helices
-            strandSet.part().partStrandChangedSignal.emit(strandSet.part(), strandSet.virtualHelix())
-
-            # Restore connections to this strand
-            if strand5p != None:
-                if self._solo:
-                    part = strandSet.part()
-                    vh = strandSet.virtualHelix()
-                    part.partActiveVirtualHelixChangedSignal.emit(part, vh)
-                    # strand5p.strandXover5pChangedSignal.emit(
-                    #                                        strand5p, strand)
-                strand5p.strandUpdateSignal.emit(strand5p)
+            part.partStrandChangedSignal.emit(part, vh)
+            if self._solo and (self._cut5p or self._cut3p):
+                part.partActiveVirtualHelixChangedSignal.emit(part, vh)
+            for strand, removedStrand in self._cut5p + self._cut3p:
                 strand.strandUpdateSignal.emit(strand)
+                removedStrand.strandUpdateSignal.emit(removedStrand)
+        # end def
+    # end class
 
-            if strand3p != None:
-                if self._solo:
-                    part = strandSet.part()
-                    vh = strandSet.virtualHelix()
-                    part.partActiveVirtualHelixChangedSignal.emit(part, vh)
-                    # strand.strandXover5pChangedSignal.emit(strand, strand3p)
-                strand3p.strandUpdateSignal.emit(strand3p)
-                strand.strandUpdateSignal.emit(strand)
+    class RemoveStrandCommand(RemoveStrandsCommand):
+        """
+        RemoveStrandCommand deletes a strand, splitting its oligo like
+        RemoveStrandsCommand: a loop opens into one oligo that keeps its
+        color, otherwise the part 3' of the strand gets a new color.
+        """
+        def __init__(self, strandSet, strand, strandSetIdx, solo=True):
+            super(StrandSet.RemoveStrandCommand, self).__init__(strandSet, \
+                                                        [strand], solo)
+            self._strand = strand
+            self._sSetIdx = strandSetIdx
+        # end def
+
+        def _removeFromList(self):
+            self._strandSet._removeFromStrandList(self._strand)
+        # end def
+
+        def _restoreToList(self):
+            self._strandSet._addToStrandList(self._strand, self._sSetIdx)
         # end def
     # end class
 
@@ -973,6 +1011,7 @@ class StrandSet(QObject):
             self._newOligo = pS.oligo().shallowCopy()
             self._sLowOligo = sLOlg = strandLow.oligo()
             self._sHighOligo = sHOlg = strandHigh.oligo()
+            self._absorbTokens = []
 
             self._sSetIdx = lowStrandSetIdx
 
@@ -985,6 +1024,7 @@ class StrandSet(QObject):
             newIdxs = strandLow.lowIdx(), strandHigh.highIdx()
             newStrand = strandLow.shallowCopy()
             newStrand.setIdxs(newIdxs)
+            newStrand._invalidateTotalLength()
             newStrand.setConnectionHigh(strandHigh.connectionHigh())
             # Merging any decorators
             newStrand.addDecorators(strandHigh.decorators())
@@ -996,8 +1036,8 @@ class StrandSet(QObject):
             if strandLow._sequence or strandHigh._sequence:
                 tL = strandLow.totalLength()
                 tH = strandHigh.totalLength()
-                seqL = strandLow._sequence if strandLow._sequence else "".join([" " for i in range(tL)])
-                seqH = strandHigh._sequence if strandHigh._sequence else "".join([" " for i in range(tH)])    
+                seqL = strandLow._sequence if strandLow._sequence else " " * tL
+                seqH = strandHigh._sequence if strandHigh._sequence else " " * tH
                 if newStrand.isDrawn5to3():
                     newStrand._sequence = seqL + seqH
                 else:
@@ -1011,8 +1051,8 @@ class StrandSet(QObject):
             nS = self._newStrand
             idx = self._sSetIdx
             olg = self._newOligo
-            lOlg = sL.oligo()
-            hOlg = sH.oligo()
+            lOlg = self._sLowOligo
+            hOlg = self._sHighOligo
 
             # Remove old strands from the sSet (reusing idx, so order matters)
             sS._removeFromStrandList(sL)
@@ -1036,15 +1076,22 @@ class StrandSet(QObject):
                 else:
                     nScH.setConnectionHigh(nS)
 
-            # Traverse the strands via 3'conns to assign the new oligo
-            for strand in olg.strand5p().generator3pStrand():
-                Strand.setOligo(strand, olg)  # emits strandHasNewOligoSignal
+            # Assign the new oligo to the strands of both old oligos
+            # (newStrand shares the label of strandLow)
+            tokens = self._absorbTokens
+            tokens.append(olg._absorb(lOlg))
+            if hOlg != lOlg:
+                tokens.append(olg._absorb(hOlg))
 
-            # Add new oligo and remove old oligos
-            olg.addToPart(sS.part())
+            # Remove old oligos and add new oligo, in that order so that a
+            # redo gives it back the oligo table row it had
             lOlg.removeFromPart()
             if hOlg != lOlg:  # check if a loop was created
                 hOlg.removeFromPart()
+            olg.addToPart(sS.part())
+            lOlg.oligoIdentityChangedSignal.emit(olg)
+            if hOlg != lOlg:
+                hOlg.oligoIdentityChangedSignal.emit(olg)
 
             # Emit Signals related to destruction and addition
             sL.strandRemovedSignal.emit(sL)
@@ -1083,14 +1130,14 @@ class StrandSet(QObject):
                 else:
                     sHcH.setConnectionHigh(sH)
 
-            # Traverse the strands via 3'conns to assign the old oligo
-            for strand in lOlg.strand5p().generator3pStrand():
-                Strand.setOligo(strand, lOlg)  # emits strandHasNewOligoSignal
-            for strand in hOlg.strand5p().generator3pStrand():
-                Strand.setOligo(strand, hOlg)  # emits strandHasNewOligoSignal
+            # Give the strands back their old oligos
+            tokens = self._absorbTokens
+            while tokens:
+                olg._unabsorb(tokens.pop())
 
             # Remove new oligo and add old oligos
             olg.removeFromPart()
+            olg.oligoIdentityChangedSignal.emit(lOlg)
             lOlg.addToPart(sL.part())
             if hOlg != lOlg:
                 hOlg.addToPart(sH.part())
@@ -1154,6 +1201,10 @@ class StrandSet(QObject):
             # there is only ever one xover a strand is in charge of
             self._strand3p = std3p
             self._strand5p = std5p
+            self._olg5p, self._olg3p = olg5p, olg3p
+            self._keptOligo = None  # the new oligo that absorbed the old one
+            self._absorbToken = None
+            self._relabelled = []
 
             # Update strand connectivity
             strandLow.setConnectionHigh(None)
@@ -1162,6 +1213,8 @@ class StrandSet(QObject):
             # Resize strands and update decorators
             strandLow.setIdxs((strand.lowIdx(), iNewLow))
             strandHigh.setIdxs((iNewLow + 1, strand.highIdx()))
+            strandLow._invalidateTotalLength()
+            strandHigh._invalidateTotalLength()
 
             # Update the oligo for things like its 5prime end and isLoop
             olg5p.strandSplitUpdate(std5p, std3p, olg3p, strand)
@@ -1229,19 +1282,26 @@ class StrandSet(QObject):
                 else:
                     sHcH.setConnectionHigh(sH)
 
-            # Traverse the strands via 3'conns to assign the new oligos
-            for strand in lOlg.strand5p().generator3pStrand():
-                Strand.setOligo(strand, lOlg)  # emits strandHasNewOligoSignal
-            if wasNotLoop:  # do the second oligo which is different
-                for strand in hOlg.strand5p().generator3pStrand():
-                    # emits strandHasNewOligoSignal
-                    Strand.setOligo(strand, hOlg)
+            # Assign the new oligos. One of them takes over the old oligo's
+            # strands, and only the shorter side of the split is relabelled
+            if wasNotLoop:
+                keep, other = self._olg5p, self._olg3p
+                if other.length() > keep.length():
+                    keep, other = other, keep
+                self._keptOligo = keep
+                self._absorbToken = keep._absorb(olg)
+                other._relabel(other.strand5p().generator3pStrand(), \
+                               self._relabelled, emitSignal=False)
+            else:
+                self._keptOligo = lOlg
+                self._absorbToken = lOlg._absorb(olg)
 
             # Add new oligo and remove old oligos from the part
             olg.removeFromPart()
             lOlg.addToPart(sL.part())
             if wasNotLoop:
                 hOlg.addToPart(sH.part())
+            olg.oligoIdentityChangedSignal.emit(lOlg)
 
             # Emit Signals related to destruction and addition
             oS.strandRemovedSignal.emit(oS)
@@ -1282,14 +1342,19 @@ class StrandSet(QObject):
                 else:
                     oScH.setConnectionHigh(oS)
 
-            # Traverse the strands via 3'conns to assign the old oligo
-            for strand in olg.strand5p().generator3pStrand():
-                Strand.setOligo(strand, olg)
-            # Add old oligo and remove new oligos from the part
-            olg.addToPart(sS.part())
+            # Give the strands back their old oligo labels
+            Oligo._restoreLabels(self._relabelled, emitSignal=False)
+            self._keptOligo._unabsorb(self._absorbToken)
+            self._keptOligo = self._absorbToken = None
+            # Remove new oligos and add old oligo back to the part, in that
+            # order so that it gets its old oligo table row back
             lOlg.removeFromPart()
             if wasNotLoop:
                 hOlg.removeFromPart()
+            olg.addToPart(sS.part())
+            lOlg.oligoIdentityChangedSignal.emit(olg)
+            if wasNotLoop:
+                hOlg.oligoIdentityChangedSignal.emit(olg)
 
             # Emit Signals related to destruction and addition
             sL.strandRemovedSignal.emit(sL)
@@ -97,7 +97,9 @@ class VirtualHelix(QObject):
     def setNumber(self, number):
         if self._number != number:
             numToVhDict = self._part._numberToVirtualHelix
-            numToVhDict[self._number] = None
+            # during a renumber another helix may already own the old number
+            if numToVhDict.get(self._number) is self:
+                numToVhDict[self._number] = None
             self._number = number
             self.virtualHelixNumberChangedSignal.emit(self, number)
             numToVhDict[number] = self
@@ -155,7 +157,7 @@ class VirtualHelix(QObject):
     # end def
 
     def hasStrandAtIdx(self, idx):
-        return self._scafStrandSet.hasStrandAt(idx, idx)
+        return self._scafStrandSet.getStrand(idx) is not None
     # end def
 
     def indexOfRightmostNonemptyBase(self):
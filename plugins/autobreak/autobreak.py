@@ -4,6 +4,7 @@ from model.strandset import StrandSet
 from model.enum import StrandType
 from model.parts.part import Part
 from model.oligo import Oligo
+from collections import OrderedDict
 from multiprocessing import Pool, cpu_count
 from operator import itemgetter
 
@@ -14,9 +15,16 @@ except:
     nx = False
 
 token_cache = {}
+# solutions keyed by oligo topology and settings, so breaking an oligo
+# whose topology was seen before (e.g. after an undo) skips tokenizing;
+# unlike token_cache it is kept between runs, up to maxCachedSolutions
+# with the least recently used solution dropped first
+solution_cache = OrderedDict()
+maxCachedSolutions = 10000
 
 def breakStaples(part, settings):
-    clearTokenCache()
+    global token_cache
+    token_cache = {}  # token solutions depend on the settings
     breakOligos = part.document().selectedOligos()
     if not breakOligos:
         breakOligos = part.oligos()
@@ -40,7 +48,14 @@ def nxBreakStaple(oligo, settings):
     maxStapleLen = settings.get('maxStapleLen', 40)
     maxStapleLenPlusOne = maxStapleLen+1
     tgtStapleLen = settings.get('tgtStapleLen', 35)
-    
+
+    solutionKey = (oligo.topologyKey(), tuple(sorted(settings.items())))
+    solution = getCachedSolution(solutionKey)
+    if solution is not None:
+        tokenList, breakItems, shortestScoreIdx = solution
+        nxPerformBreaks(oligo, breakItems, tokenList, shortestScoreIdx, minStapleLegLen)
+        return
+
     tokenList = tokenizeOligo(oligo, settings)
 
     # print "tkList", tokenList, oligo.length(), oligo.color()
@@ -50,6 +65,7 @@ def nxBreakStaple(oligo, settings):
     if cacheString in token_cache:
         # print "cacheHit!"
         breakItems, shortestScoreIdx = token_cache[cacheString]
+        addToSolutionCache(solutionKey, tokenList, breakItems, shortestScoreIdx)
         nxPerformBreaks(oligo, breakItems, tokenList, shortestScoreIdx, minStapleLegLen)
     else:
         staple_limits = [minStapleLen, maxStapleLen, tgtStapleLen] 
@@ -81,6 +97,7 @@ def nxBreakStaple(oligo, settings):
             shortestScore, shortestScoreIdx = scoreTuple
             breakItems = results[shortestScoreIdx][0][1]
             addToTokenCache(cacheString, breakItems, shortestScoreIdx)
+            addToSolutionCache(solutionKey, tokenList, breakItems, shortestScoreIdx)
             nxPerformBreaks(oligo, breakItems, tokenList, shortestScoreIdx, minStapleLegLen)
         else:
             if oligo.isLoop():
@@ -92,7 +109,25 @@ def addToTokenCache(cacheString, breakItems, shortestScoreIdx):
 # end def
 
 def clearTokenCache():
+    """Empties the token cache and the solution cache."""
+    global token_cache
     token_cache = {}
+    solution_cache.clear()
+# end def
+
+def getCachedSolution(solutionKey):
+    """Returns the cached solution for solutionKey, or None."""
+    solution = solution_cache.pop(solutionKey, None)
+    if solution is not None:  # reinsert as the most recently used
+        solution_cache[solutionKey] = solution
+    return solution
+# end def
+
+def addToSolutionCache(solutionKey, tokenList, breakItems, shortestScoreIdx):
+    solution_cache.pop(solutionKey, None)
+    while len(solution_cache) >= maxCachedSolutions:
+        solution_cache.popitem(last=False)  # least recently used
+    solution_cache[solutionKey] = (tokenList, breakItems, shortestScoreIdx)
 # end def
 
 def stringifyToken(oligo, tokenList):
@@ -192,23 +227,21 @@ def nxPerformBreaks(oligo, breakItems, tokenList, startingToken, minStapleLegLen
 # end def
 
 def getStrandAtLengthInOligo(strandIn, length):
-    strandGen = strandIn.generator3pStrand()
-    strand = strandGen.next()
-    assert(strand == strandIn)
-    # find the starting strand
-    strandCounter = strand.totalLength()
-    while strandCounter < length:
-        try:
-            strand = strandGen.next()
-        except:
-            print "yikes: ", strand.connection3p(), strandCounter, length, strand.oligo().isLoop(), strandIn.oligo().length()
-            raise Exception
-        strandCounter += strand.totalLength()
-    # end while
+    oligo = strandIn.oligo()
+    if length <= 0:  # at or before the 5' end of strandIn
+        strand, delta = strandIn, length - 1
+    else:
+        target = oligo.lengthAtStrand(strandIn) + length
+        if oligo.isLoop() and target > oligo.length():
+            target -= oligo.length()  # past the seam, back around the loop
+        found = oligo.strandAtLength(target)
+        if found is None:
+            raise Exception("Length %d from %s is outside its oligo of length %d" \
+                                            % (length, strandIn, oligo.length()))
+        strand, delta = found
     is5to3 = strand.isDrawn5to3()
-    delta = strand.totalLength() - (strandCounter - length) - 1
     idx5p = strand.idx5Prime()
-    # print "diff", delta, "idx5p", idx5p, "5to3", is5to3, "sCount", strandCounter, "L", length
+    # print "diff", delta, "idx5p", idx5p, "5to3", is5to3, "L", length
     outIdx = idx5p + delta if is5to3 else idx5p - delta
     return (strand, outIdx, is5to3)
 # end def
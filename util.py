@@ -31,7 +31,7 @@ from traceback import extract_stack
 from random import Random
 import string
 import sys
-from os import path
+from os import path, environ
 import platform
 from itertools import dropwhile, starmap
 prng = Random()
@@ -276,6 +276,14 @@ def isLinux():
     else:
         return False
 
+def envFlag(name):
+    """
+    Returns True if the environment variable name is set to 1, true, yes
+    or on (any case); unset, empty, 0, false, no and off are False.
+    """
+    value = environ.get(name, '').strip().lower()
+    return value in ('1', 'true', 'yes', 'on')
+
 def methodName():
     """Returns string containing name of the calling method."""
     return inspect.stack()[1][3]
@@ -178,6 +178,11 @@ class StrandItem(QGraphicsLineItem):
         self._updateSequenceText()
     # end def
 
+    def oligoIdentityChangedSlot(self, oligo):
+        """The strands of our oligo may now belong to another oligo."""
+        self.strandHasNewOligoSlot(self._modelStrand)
+    # end def
+
     def strandHasNewOligoSlot(self, strand):
         strand = self._modelStrand
         self._controller.reconnectOligoSignals()
@@ -28,6 +28,7 @@ Created by Shawn on 2011-02-05.
 
 from exceptions import IndexError
 from controllers.itemcontrollers.activesliceitemcontroller import ActiveSliceItemController
+from model.enum import StrandType
 from views import styles
 import util
 
@@ -45,6 +46,7 @@ class ActiveSliceItem(QGraphicsRectItem):
         super(ActiveSliceItem, self).__init__(partItem)
         self._partItem = partItem
         self._controller = ActiveSliceItemController(self, partItem.part())
+        self._activeVHs = set()  # helices with scaffold at the active slice
         self.setFlag(QGraphicsItem.ItemHasNoContents)
     # end def
 
@@ -56,6 +58,10 @@ class ActiveSliceItem(QGraphicsRectItem):
         vhi = partItem.getVirtualHelixItemByCoord(*vh.coord())
         activeBaseIdx = partItem.part().activeBaseIndex()
         isActiveNow = vh.hasStrandAtIdx(activeBaseIdx)
+        if isActiveNow:
+            self._activeVHs.add(vh)
+        else:
+            self._activeVHs.discard(vh)
         vhi.setActiveSliceView(isActiveNow, activeBaseIdx)
     # end def
 
@@ -63,13 +69,18 @@ class ActiveSliceItem(QGraphicsRectItem):
         part = self.part()
         if part.numberOfVirtualHelices() == 0:
             return
-        newlyActiveVHs = set()
         activeBaseIdx = part.activeBaseIndex()
-        for vhi in self._partItem._virtualHelixHash.itervalues():
-            vh = vhi.virtualHelix()
-            if vh:
-                isActiveNow = vh.hasStrandAtIdx(activeBaseIdx)
-                vhi.setActiveSliceView(isActiveNow, activeBaseIdx)
+        # one column read of the part's owner map gives every helix with
+        # scaffold at the slice; only helices that were or are now active
+        # need updating
+        activeVHs = set(ss.virtualHelix() for ss in part.strandSetsOccupiedAt(
+                                        activeBaseIdx, StrandType.Scaffold))
+        vhiHash = self._partItem._virtualHelixHash
+        for vh in activeVHs | self._activeVHs:
+            vhi = vhiHash.get(vh.coord())
+            if vhi and vhi.virtualHelix() is vh:
+                vhi.setActiveSliceView(vh in activeVHs, activeBaseIdx)
+        self._activeVHs = activeVHs
     # end def
 
     def updateRectSlot(self, part):
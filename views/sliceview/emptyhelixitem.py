@@ -219,8 +219,8 @@ class EmptyHelixItem(QGraphicsEllipseItem):
                     # resize and install external xovers
                     try:
                         # resize to the nearest prexover on either side of idx
-                        newLo = util.nearest(idx, part.getPreXoversHigh(strandType, p2, maxIdx=idx-10))
-                        newHi = util.nearest(idx, part.getPreXoversLow(strandType, p2, minIdx=idx+10))
+                        newLo = part.nearestPreXoverHigh(strandType, p2, idx, maxIdx=idx-10)
+                        newHi = part.nearestPreXoverLow(strandType, p2, idx, minIdx=idx+10)
                         if strand1.canResizeTo(newLo, newHi) and \
                            strand2.canResizeTo(newLo, newHi):
                             # do the resize
@@ -243,9 +243,9 @@ class EmptyHelixItem(QGraphicsEllipseItem):
                             l1, h1 = strand1.idxs()
                             oLow, oHigh = util.overlap(l0, h0, l1, h1)
                             try:
-                                lList = filter(lambda x:x>oLow and x<oHigh, part.getPreXoversLow(strandType, p0))
+                                lList = part.getPreXoversLow(strandType, p0, minIdx=oLow+1, maxIdx=oHigh-1)
                                 lX = lList[len(lList)/2]
-                                hList = filter(lambda x:x>oLow and x<oHigh, part.getPreXoversHigh(strandType, p0))
+                                hList = part.getPreXoversHigh(strandType, p0, minIdx=oLow+1, maxIdx=oHigh-1)
                                 hX = hList[len(hList)/2]
                                 # install high xover first
                                 part.createXover(strand0, hX, strand1, hX)
@@ -277,8 +277,8 @@ class EmptyHelixItem(QGraphicsEllipseItem):
                     # resize and install external xovers
                     try:
                         # resize to the nearest prexover on either side of idx
-                        newLo1 = newLo2 = util.nearest(idx, part.getPreXoversHigh(StrandType.Scaffold, p2, maxIdx=idx-8))
-                        newHi = util.nearest(idx, part.getPreXoversLow(StrandType.Scaffold, p2, minIdx=idx+8))
+                        newLo1 = newLo2 = part.nearestPreXoverHigh(StrandType.Scaffold, p2, idx, maxIdx=idx-8)
+                        newHi = part.nearestPreXoverLow(StrandType.Scaffold, p2, idx, minIdx=idx+8)
 
                         if vh1.number() != 0:  # after the first helix
                             newLo1 = strand1.lowIdx()  # leave alone the lowIdx
@@ -301,7 +301,7 @@ class EmptyHelixItem(QGraphicsEllipseItem):
                     idx = part.activeBaseIndex()
                     try:
                         # resize to the nearest prexover on either side of idx
-                        newLo = util.nearest(idx, part.getPreXoversHigh(StrandType.Scaffold, p2, maxIdx=idx-8))
+                        newLo = part.nearestPreXoverHigh(StrandType.Scaffold, p2, idx, maxIdx=idx-8)
 
                         if strand1.canResizeTo(newLo, strand1.highIdx()) and \
                            strand2.canResizeTo(newLo, strand2.highIdx()):
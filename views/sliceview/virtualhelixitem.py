@@ -78,6 +78,7 @@ class VirtualHelixItem(QGraphicsEllipseItem):
 
         self.setBrush(self._outOfSliceBrush)
         self.setPen(self._outOfSlicePen)
+        self._isActive = False  # drawn as in the active slice
         self.setRect(self._rect)
 
         # handle the label specific stuff
@@ -188,14 +189,19 @@ class VirtualHelixItem(QGraphicsEllipseItem):
 
     def setActiveSliceView(self, isActiveNow, idx):
         if isActiveNow:
+            self.updateArrow(idx)
+            if self._isActive:
+                return  # only the arrow moves
             self.setPen(self._usePen)
             self.setBrush(self._useBrush)
-            self.updateArrow(idx)
             self.arrow.show()
         else:
+            if not self._isActive:
+                return
             self.setPen(self._outOfSlicePen)
             self.setBrush(self._outOfSliceBrush)
             self.arrow.hide()
+        self._isActive = isActiveNow
     # end def
 
     ############################ User Interaction ############################
@@ -157,6 +157,13 @@ class StrandItem(object):
         """oligoSequenceClearedSlot - empty"""
         pass
 
+    def oligoIdentityChangedSlot(self, oligo):
+        """
+        Receives notification from the model that the strands of the oligo
+        may now belong to another oligo.
+        """
+        self.strandHasNewOligoSlot(self._modelStrand)
+
     def strandHasNewOligoSlot(self, strand):
         """
         Receives notification from the model when there is a new oligo.